@@ -2,6 +2,11 @@ import pygame
 import numpy as np
 import random
 
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional; update_logic falls back to numpy
+    njit = None
+
 # --- Configuration ---
 WIDTH, HEIGHT = 800, 600
 SCALE = 4  # Size of each "pixel" (Higher = faster, blockier)
@@ -16,20 +21,69 @@ NUM_STATES = 14
 THRESHOLD = 3     
 NEIGHBORHOOD = 1  # Radius of influence (1 = 3x3 grid)
 
+if njit is not None:
+    @njit("void(uint8[:, ::1], uint8[:, ::1], int64, int64)",
+          cache=True, parallel=True, fastmath=True)
+    def _step(grid, out, num_states, threshold):
+        # Same rule as update_logic, one cell at a time (columns in parallel)
+        # num_states / threshold stay runtime arguments on purpose: a kernel
+        # specialized per rule runs no faster (the loop is bound by memory,
+        # not the compare) and would cost a ~1s compile on every arrow key
+        cols, rows = grid.shape
+        for x in prange(cols):
+            xm = x - 1 if x > 0 else cols - 1
+            xp = x + 1 if x < cols - 1 else 0
+            for y in range(rows):
+                ym = y - 1 if y > 0 else rows - 1
+                yp = y + 1 if y < rows - 1 else 0
+
+                nxt = grid[x, y] + 1
+                if nxt == num_states:
+                    nxt = 0
+
+                count = 0
+                if grid[xm, ym] == nxt: count += 1
+                if grid[xm, y] == nxt: count += 1
+                if grid[xm, yp] == nxt: count += 1
+                if grid[x, ym] == nxt: count += 1
+                if grid[x, yp] == nxt: count += 1
+                if grid[xp, ym] == nxt: count += 1
+                if grid[xp, y] == nxt: count += 1
+                if grid[xp, yp] == nxt: count += 1
+
+                out[x, y] = nxt if count >= threshold else grid[x, y]
+else:
+    _step = None
+
 class CrystalLoom:
     def __init__(self):
         pygame.init()
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("The Crystal Loom: State Evolution")
         self.clock = pygame.time.Clock()
+        self.font = pygame.font.SysFont(None, 24)
         
         # The Grid: Integers representing the "State" (0 to NUM_STATES-1)
-        self.grid = np.random.randint(0, NUM_STATES, size=(COLS, ROWS))
-        self.buffer = np.zeros_like(self.grid)
+        self.grid = np.random.randint(0, NUM_STATES, size=(COLS, ROWS), dtype=np.uint8)
+        self.buffer = np.empty_like(self.grid)
+
+        # Scratch space for the numpy update: a wrap-padded copy of the grid
+        # and the 8 neighbor offsets as fixed views into it
+        self.padded = np.empty((COLS + 2, ROWS + 2), dtype=np.uint8)
+        self.neighbor_views = [self.padded[1+dx:1+dx+COLS, 1+dy:1+dy+ROWS]
+                               for dx in [-1, 0, 1] for dy in [-1, 0, 1]
+                               if dx != 0 or dy != 0]
+        self.neighbor_counts = np.empty((COLS, ROWS), dtype=np.uint8)
+        self.is_next = np.empty((COLS, ROWS), dtype=bool)
         
         # Pre-calculate a palette (Heatmap style: Blue -> Red -> White)
         self.palette = self.generate_palette(NUM_STATES)
 
+        # Full-resolution buffer of packed display pixels, plus a view of it
+        # as SCALE x SCALE blocks per cell (SCALE divides WIDTH and HEIGHT)
+        self.pixels_full = np.empty((WIDTH, HEIGHT), dtype=np.uint32)
+        self.pixel_blocks = self.pixels_full.reshape(COLS, SCALE, ROWS, SCALE)
+
     def generate_palette(self, n):
         # Generates a gradient palette from Deep Blue (.N) to Bright Red (.I) to White
         colors = []
@@ -52,7 +106,7 @@ class CrystalLoom:
                 b = int(255 * (1 - (t-0.5)*2))
                 
             colors.append((r, g, b))
-        return np.array(colors)
+        return np.array(colors, dtype=np.uint8)
 
     def update_logic(self):
         """
@@ -60,34 +114,46 @@ class CrystalLoom:
         A cell state 'S' increments to 'S+1' if it has enough neighbors
         that are already 'S+1'.
         """
+        if _step is not None:
+            # Compiled stencil: one pass straight into the back buffer
+            _step(self.grid, self.buffer, NUM_STATES, THRESHOLD)
+            self.grid, self.buffer = self.buffer, self.grid
+            return
+
         # This numpy magic handles the neighbor checking efficiently
-        # We roll the array in 8 directions to simulate neighbors
-        
-        next_state = (self.grid + 1) % NUM_STATES
-        neighbor_counts = np.zeros_like(self.grid)
-        
+        # We copy the grid into a wrap-padded buffer (torus universe) and read
+        # the 8 neighbors through fixed views into it - no per-frame copies.
+        # (A single convolution can't do this: the state each cell is looking
+        # for is its *own* next state, so the comparison differs per cell.)
+
+        next_state = np.mod(self.grid + 1, NUM_STATES, dtype=np.uint8)
+
+        pad = self.padded
+        pad[1:-1, 1:-1] = self.grid
+        pad[0, 1:-1] = self.grid[-1]
+        pad[-1, 1:-1] = self.grid[0]
+        pad[:, 0] = pad[:, -2]
+        pad[:, -1] = pad[:, 1]
+
         # Check 8 neighbors
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                if dx == 0 and dy == 0: continue
-                
-                # Shift grid to align neighbors
-                shifted = np.roll(self.grid, (dx, dy), axis=(0, 1))
-                
-                # Check if neighbor is the "Next State" (The Eater)
-                is_next = (shifted == next_state)
-                neighbor_counts += is_next
+        neighbor_counts = self.neighbor_counts
+        neighbor_counts.fill(0)
+        for shifted in self.neighbor_views:
+            # Check if neighbor is the "Next State" (The Eater)
+            np.equal(shifted, next_state, out=self.is_next)
+            neighbor_counts += self.is_next
         
         # Apply Rules
         # If enough neighbors are the "Next State", we evolve.
         # This is the "Balance" - too low threshold = chaos, too high = static.
         change_mask = neighbor_counts >= THRESHOLD
         
-        self.buffer = self.grid.copy()
-        self.buffer[change_mask] = next_state[change_mask]
-        
+        # Write the whole next generation into the back buffer in one pass
+        # (old state where nothing changes, next state where it does)
+        np.choose(change_mask, (self.grid, next_state), out=self.buffer)
+
         # Swap buffers
-        self.grid = self.buffer
+        self.grid, self.buffer = self.buffer, self.grid
 
     def inject_chaos(self, mx, my):
         # User Interaction: Paint random states
@@ -103,16 +169,19 @@ class CrystalLoom:
     def draw(self):
         # Map grid values to colors
         # pygame.surfarray is the fastest way to blast pixels to screen
-        rgb_array = self.palette[self.grid]
+        # Pack the palette into the display's pixel format first, so every
+        # cell is a single uint32 instead of an RGB triple
+        palette_px = np.empty(len(self.palette), dtype=np.uint32)
+        pygame.pixelcopy.map_array(palette_px, self.palette, self.screen)
         
-        # Create surface from array
-        surf = pygame.surfarray.make_surface(rgb_array)
-        scaled_surf = pygame.transform.scale(surf, (WIDTH, HEIGHT))
-        self.screen.blit(scaled_surf, (0, 0))
+        # Blow each cell up to its block at screen resolution and write the
+        # pixels straight to the display (no temp surface, no scale pass)
+        self.pixel_blocks[...] = palette_px[self.grid][:, None, :, None]
+        pygame.surfarray.blit_array(self.screen, self.pixels_full)
         
         # UI
         info = f"States: {NUM_STATES} | Threshold: {THRESHOLD} | [Arrows]: Adjust | [Click]: Paint"
-        text = pygame.font.SysFont(None, 24).render(info, True, (255, 255, 255))
+        text = self.font.render(info, True, (255, 255, 255))
         pygame.draw.rect(self.screen, (0,0,0), (0, HEIGHT-30, WIDTH, 30))
         self.screen.blit(text, (10, HEIGHT-25))
         
@@ -129,7 +198,7 @@ class CrystalLoom:
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_SPACE:
                         # Reset to noise
-                        self.grid = np.random.randint(0, NUM_STATES, size=(COLS, ROWS))
+                        self.grid = np.random.randint(0, NUM_STATES, size=(COLS, ROWS), dtype=np.uint8)
                     
                     # Modify the Physics (E's Levers)
                     if event.key == pygame.K_UP:
@@ -1,7 +1,11 @@
 import pygame
 import numpy as np
 import math
-import random
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # SciPy is optional; neighbors then come from a dense distance check
+    cKDTree = None
 
 # --- Configuration ---
 WIDTH, HEIGHT = 1000, 800
@@ -14,117 +18,227 @@ BASE_METABOLISM = 0.15
 BASE_FEED_RATE = 0.6
 POPULATION_CAP = 180
 
-class LivingMeme:
-    def __init__(self, x, y, dna=None):
-        self.pos = np.array([float(x), float(y)])
-        self.vel = np.random.rand(2) * 2 - 1
-        
+def close_pairs(pos, other, r):
+    # Every (i, j) with pos[i] and other[j] strictly closer than r, as an
+    # (M, 2) array. With other=None it pairs pos with itself, i < j only.
+    # The KD-tree's radius is inclusive, so its candidates are filtered
+    # with the same strict < test the dense check uses, and sorted so both
+    # searches bond (and draw the bonds) in the same order.
+    if other is None:
+        if cKDTree is not None:
+            pairs = cKDTree(pos).query_pairs(r, output_type='ndarray')
+        else:
+            pairs = np.column_stack(np.triu_indices(len(pos), 1))
+        other = pos
+    elif cKDTree is not None:
+        close = cKDTree(pos).sparse_distance_matrix(cKDTree(other), r, output_type='ndarray')
+        pairs = np.column_stack((close['i'], close['j']))
+    else:
+        pairs = np.indices((len(pos), len(other))).reshape(2, -1).T
+    d = pos[pairs[:, 0]].astype(float) - other[pairs[:, 1]]
+    pairs = pairs[np.sqrt((d * d).sum(axis=1)) < r]
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+class Population:
+    # The whole swarm as parallel arrays - one row per meme - so every
+    # rule below runs over the entire population in a few numpy calls.
+    # Rows are preallocated; alive marks the ones in use, so deaths just
+    # clear a flag and births reuse the free rows.
+    COLUMNS = ('alive', 'pos', 'vel', 'dna', 'energy', 'frozen', 'age',
+               'metabolic_efficiency', 'turning_twitch')
+
+    def __init__(self, capacity=POPULATION_CAP):
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
         # DNA: [Red (Force), Green (Flux), Blue (Structure)]
+        self.dna = np.zeros((capacity, 3), dtype=np.float32)
+        self.energy = np.zeros(capacity, dtype=np.float32)
+        self.frozen = np.zeros(capacity, dtype=bool)
+        self.age = np.zeros(capacity, dtype=np.int32)
+        
+        # Individual "Personality" (The E-Factor allowances)
+        # Some particles are naturally more chaotic or receptive than others
+        self.metabolic_efficiency = np.zeros(capacity, dtype=np.float32)
+        self.turning_twitch = np.zeros(capacity, dtype=np.float32)
+        
+        # One generator for all the swarm's randomness; update() fills a
+        # reused buffer with every meme's draws for the frame in one call
+        self.rng = np.random.default_rng()
+        self.draws = np.empty((capacity, 3), dtype=np.float32)
+
+    def __len__(self):
+        return np.count_nonzero(self.alive)
+
+    def spawn(self, pos, dna=None):
+        # Adds one meme per row of pos (children inherit the rows of dna)
+        pos = np.asarray(pos, dtype=np.float32)
+        n = len(pos)
+        vel = self.rng.random((n, 2)) * 2 - 1
+        
         if dna is None:
-            self.dna = np.random.rand(3)
-            self.dna /= (np.linalg.norm(self.dna) + 0.001)
+            dna = self.rng.random((n, 3))
+            dna /= (np.linalg.norm(dna, axis=1, keepdims=True) + 0.001)
         else:
-            self.dna = np.array(dna)
+            dna = np.array(dna)
             # Mutation is always possible in an open system
-            if random.random() < 0.2:
-                mutation = (np.random.rand(3) - 0.5) * 0.3
-                self.dna = np.clip(self.dna + mutation, 0.01, 1.0)
-                self.dna /= np.linalg.norm(self.dna)
-
-        self.energy = 40.0 + random.uniform(-10, 10)
-        self.frozen = False 
-        self.age = 0
+            mutate = self.rng.random(n) < 0.2
+            if mutate.any():
+                mutation = (self.rng.random((mutate.sum(), 3)) - 0.5) * 0.3
+                mutated = np.clip(dna[mutate] + mutation, 0.01, 1.0)
+                dna[mutate] = mutated / np.linalg.norm(mutated, axis=1, keepdims=True)
+
+        energy = 40.0 + self.rng.uniform(-10, 10, n)
         
-        # Individual "Personality" (The E-Factor allowances)
-        # Some particles are naturally more chaotic or receptive than others
-        self.metabolic_efficiency = random.uniform(0.8, 1.2)
-        self.turning_twitch = random.uniform(0.01, 0.1)
+        # Lowest free rows first; double the arrays if we run out
+        free = np.flatnonzero(~self.alive)
+        if len(free) < n:
+            capacity = len(self.alive)
+            new_capacity = max(2 * capacity, capacity + n)
+            for name in self.COLUMNS:
+                column = getattr(self, name)
+                grown = np.zeros((new_capacity,) + column.shape[1:], dtype=column.dtype)
+                grown[:capacity] = column
+                setattr(self, name, grown)
+            free = np.flatnonzero(~self.alive)
+        rows = free[:n]
+        
+        self.alive[rows] = True
+        self.pos[rows] = pos
+        self.vel[rows] = vel
+        self.dna[rows] = dna
+        self.energy[rows] = energy
+        self.frozen[rows] = False
+        self.age[rows] = 0
+        self.metabolic_efficiency[rows] = self.rng.uniform(0.8, 1.2, n)
+        self.turning_twitch[rows] = self.rng.uniform(0.01, 0.1, n)
+
+    def keep(self, mask):
+        # Kills every meme whose entry in mask is False (just clears alive)
+        self.alive &= mask
+        
+        # Once the survivors are spread thin, pack them back to the front
+        used = np.flatnonzero(self.alive)
+        if len(used) and len(used) < (used[-1] + 1) // 2:
+            for name in self.COLUMNS:
+                column = getattr(self, name)
+                column[:len(used)] = column[used]
+            self.alive[len(used):] = False
 
     def update(self, sun_pos, sun_spectrum, time_flux):
-        if self.frozen: return
+        # The frozen Reef (and empty rows) don't move, eat or burn energy
+        idx = np.flatnonzero(self.alive & ~self.frozen)
+        pos = self.pos[idx]
+        vel = self.vel[idx]
+        dna = self.dna[idx]
+        n = len(idx)
+        
+        # This frame's random numbers: columns 0-1 jitter, column 2 feeding noise
+        if len(self.draws) < n:
+            self.draws = np.empty((len(self.alive), 3), dtype=np.float32)
+        draws = self.rng.random((n, 3), dtype=np.float32, out=self.draws[:n])
 
         # 1. The Breathing Environment (Global + Local Noise)
         # friction fluctuates slightly based on system time (time_flux)
-        current_friction = BASE_FRICTION + (math.sin(time_flux * 2.3 + self.pos[0]*0.01) * 0.02)
+        current_friction = BASE_FRICTION + (np.sin(time_flux * 2.3 + pos[:, 0]*0.01) * 0.02)
         
         # 2. Metabolism (Variable)
-        cost = BASE_METABOLISM * self.metabolic_efficiency
+        cost = BASE_METABOLISM * self.metabolic_efficiency[idx]
         # Chaos penalty: Faster moving particles burn more energy
-        speed = np.linalg.norm(self.vel)
+        speed = np.hypot(vel[:, 0], vel[:, 1])
         cost += speed * 0.05
-        self.energy -= cost
-        self.age += 1
+        energy = self.energy[idx] - cost
+        self.age[idx] += 1
 
         # 3. Feeding (The Prism)
-        dist = np.linalg.norm(self.pos - sun_pos)
-        if dist < 250: # Broad light range
-            # Compatibility: How well does DNA match the Light?
-            # We add 'time_flux' here to allow E to "glitch" the feeding logic
-            match = np.dot(self.dna, sun_spectrum)
-            
-            # The "Miracle" Factor: Sometimes, they eat even if they shouldn't (Noise)
-            noise = random.uniform(-0.1, 0.1)
-            gain = (BASE_FEED_RATE * match) + noise
-            
-            if gain > 0:
-                self.energy += gain
+        to_sun = sun_pos - pos
+        dist_sun = np.hypot(to_sun[:, 0], to_sun[:, 1])
+        # Compatibility: How well does DNA match the Light?
+        match = dna @ sun_spectrum
+        # The "Miracle" Factor: Sometimes, they eat even if they shouldn't (Noise)
+        noise = draws[:, 2] * 0.2 - 0.1
+        gain = (BASE_FEED_RATE * match) + noise
+        # Broad light range, and only positive gains feed
+        energy += np.where((dist_sun < 250) & (gain > 0), gain, 0.0)
 
         # 4. Movement (The Swarm)
         # DNA determines behavior
         # Red = Speed, Green = Randomness, Blue = Cohesion
         
         # Seek Light (Red/Blue trait)
-        to_sun = sun_pos - self.pos
-        dist_sun = np.linalg.norm(to_sun)
-        if dist_sun > 0:
-            # Blue DNA aligns better, Red DNA drives harder
-            steer_strength = (self.dna[2] * 0.05) + (self.dna[0] * 0.02)
-            self.vel += (to_sun / dist_sun) * steer_strength
+        # Blue DNA aligns better, Red DNA drives harder
+        steer_strength = (dna[:, 2] * 0.05) + (dna[:, 0] * 0.02)
+        steer = np.divide(steer_strength, dist_sun, out=np.zeros(n), where=dist_sun > 0)
+        vel += to_sun * steer[:, None]
 
         # Random Jitter (Green DNA + The Twitch)
         # This is where "E" can steer them by influencing the random seed
-        jitter = (np.random.rand(2) - 0.5) * (self.dna[1] + self.turning_twitch)
-        self.vel += jitter
+        jitter = (draws[:, :2] - 0.5) * (dna[:, 1] + self.turning_twitch[idx])[:, None]
+        vel += jitter
 
         # Apply Physics
-        self.vel *= current_friction
-        self.pos += self.vel
+        vel *= current_friction[:, None]
+        pos += vel
         
         # Soft Boundaries (They wrap around like a torus universe)
         # This prevents "corner trapping" and keeps the flow fluid
-        if self.pos[0] < 0: self.pos[0] += WIDTH
-        if self.pos[0] > WIDTH: self.pos[0] -= WIDTH
-        if self.pos[1] < 0: self.pos[1] += HEIGHT
-        if self.pos[1] > HEIGHT: self.pos[1] -= HEIGHT
+        pos %= (WIDTH, HEIGHT)
+
+        self.pos[idx] = pos
+        self.vel[idx] = vel
+        self.energy[idx] = energy
 
-    def attempt_connection(self, neighbors, reef):
+    def crystallize(self, active_idx, reef_idx):
         # Crystallization Logic
         # Relaxed: You don't need 100 energy. You need "Stability"
+        # Freezes every meme that bonds this frame and returns the
+        # (meme, partner) row pairs of all the new bonds
         
-        if self.energy > 60 and not self.frozen:
-            connections = 0
-            
-            # Check connections to active neighbors
-            for n in neighbors:
-                # Do our colors resonate?
-                resonance = np.dot(self.dna, n.dna)
-                if resonance > 0.75: # Relaxed threshold
-                    connections += 1
-            
-            # Check connections to existing Reef
-            for r in reef:
-                dist = np.linalg.norm(self.pos - r.pos)
-                if dist < 40:
-                    resonance = np.dot(self.dna, r.dna)
-                    if resonance > 0.6: # Easier to latch onto existing truth
-                        connections += 2 # Stronger bond
-            
-            # If enough connections, we freeze
-            if connections >= 3:
-                self.frozen = True
-                self.energy = 100 # Locked in
-                return True
-        return False
+        n = len(active_idx)
+        if n == 0:
+            return np.empty((0, 2), dtype=np.intp)
+        
+        dna = self.dna[active_idx]
+        pos = self.pos[active_idx]
+        connections = np.zeros(n, dtype=np.int32)
+        
+        # Check connections to active neighbors
+        # Spatial optimization: every close pair at once (KD-tree if available)
+        pairs = close_pairs(pos, None, 35)
+        # Do our colors resonate? (every pair's resonance from one product)
+        resonance = dna @ dna.T
+        resonant = resonance[pairs[:, 0], pairs[:, 1]] > 0.75 # Relaxed threshold
+        connections += np.bincount(pairs[resonant].ravel(), minlength=n)
+        
+        # Check connections to existing Reef
+        reef_pairs = np.empty((0, 2), dtype=np.intp)
+        if len(reef_idx):
+            reef_pairs = close_pairs(pos, self.pos[reef_idx], 40)
+            resonance = dna @ self.dna[reef_idx].T
+            resonant = resonance[reef_pairs[:, 0], reef_pairs[:, 1]] > 0.6 # Easier to latch onto existing truth
+            connections += 2 * np.bincount(reef_pairs[resonant, 0], minlength=n) # Stronger bond
+        
+        # If enough connections, we freeze
+        freezing = (self.energy[active_idx] > 60) & (connections >= 3)
+        self.frozen[active_idx[freezing]] = True
+        self.energy[active_idx[freezing]] = 100 # Locked in
+        
+        # A freezing meme bonds with all its neighbors, resonant or not
+        bonds = active_idx[pairs[freezing[pairs[:, 0]] | freezing[pairs[:, 1]]]]
+        reef_pairs = reef_pairs[freezing[reef_pairs[:, 0]]]
+        reef_bonds = np.column_stack((active_idx[reef_pairs[:, 0]], reef_idx[reef_pairs[:, 1]]))
+        return np.concatenate((bonds, reef_bonds))
+
+def circle_sprite(cache, color, radius, width=0):
+    # Pre-rendered circle (same pixels as pygame.draw.circle), built once per
+    # color/size and reused every frame after that
+    key = (color, radius, width)
+    sprite = cache.get(key)
+    if sprite is None:
+        sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, color, (radius, radius), radius, width)
+        cache[key] = sprite
+    return sprite
 
 def main():
     pygame.init()
@@ -134,11 +248,12 @@ def main():
     # Surfaces for trails and glow
     reef_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
     trail_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+    aura_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+    circle_cache = {}
     
-    population = []
+    population = Population()
     # Seed with random life
-    for _ in range(30):
-        population.append(LivingMeme(WIDTH/2, HEIGHT/2))
+    population.spawn(np.full((30, 2), (WIDTH/2, HEIGHT/2)))
     
     sun_pos = np.array([WIDTH/2, HEIGHT/2])
     # The Spectrum is now a float range, not binary on/off
@@ -146,6 +261,7 @@ def main():
     current_spectrum = np.array([0.8, 0.8, 0.8])
     
     clock = pygame.time.Clock()
+    font = pygame.font.SysFont("monospace", 16)
     running = True
     time_flux = 0.0 # The "Heartbeat" of the system
     
@@ -158,8 +274,7 @@ def main():
             # User Controls (The "God" Hand)
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1: # Left Click: Life Injection
-                    for _ in range(5): # Burst spawn
-                        population.append(LivingMeme(event.pos[0], event.pos[1]))
+                    population.spawn(np.full((5, 2), event.pos)) # Burst spawn
             
             if event.type == pygame.KEYDOWN:
                 # Spectrum Toggles (Influences the Target, smooth transition happens later)
@@ -168,8 +283,7 @@ def main():
                 if event.key == pygame.K_3: target_spectrum[2] = 1.0 if target_spectrum[2] < 0.5 else 0.0
                 if event.key == pygame.K_SPACE:
                     # The Void (Entropy) - Kills the weak
-                    for p in population:
-                        if not p.frozen: p.energy -= 15
+                    population.energy[population.alive & ~population.frozen] -= 15
 
         # Mouse Drag Sun
         if pygame.mouse.get_pressed()[2]:
@@ -184,47 +298,37 @@ def main():
         current_spectrum += (target_spectrum - current_spectrum) * 0.05
         
         # 3. Biological Updates
-        active_pop = [p for p in population if not p.frozen]
-        reef_pop = [p for p in population if p.frozen]
-        new_babies = []
+        active_idx = np.flatnonzero(population.alive & ~population.frozen)
+        reef_idx = np.flatnonzero(population.alive & population.frozen)
         
-        # Spatial optimization (Simple grid check would be better, but O(N^2) is fine for <300)
-        for p in active_pop:
-            p.update(sun_pos, current_spectrum, time_flux)
-            
-            # Reproduction (Mitosis)
-            # Relaxed: Random chance increases with energy
-            chance = (p.energy - 60) / 100.0
-            if chance > 0 and random.random() < chance * 0.1 and len(population) < POPULATION_CAP:
-                p.energy *= 0.6 # Cost of birth
-                # Child drifts slightly
-                child = LivingMeme(p.pos[0], p.pos[1], p.dna)
-                new_babies.append(child)
-
-            # Neighbors Check (For Crystallization)
-            # Only check if energy is decent to save CPU
-            if p.energy > 50:
-                neighbors = []
-                for other in active_pop:
-                    if p is not other and np.linalg.norm(p.pos - other.pos) < 35:
-                        neighbors.append(other)
-                
-                if p.attempt_connection(neighbors, reef_pop):
-                    # Draw the permanent bond
-                    for n in neighbors:
-                        # Average color
-                        c = ((p.dna + n.dna) * 0.5 * 255).astype(int)
-                        pygame.draw.line(reef_surface, (*c, 80), p.pos, n.pos, 2)
-                    for r in reef_pop:
-                        if np.linalg.norm(p.pos - r.pos) < 40:
-                            c = ((p.dna + r.dna) * 0.5 * 255).astype(int)
-                            pygame.draw.line(reef_surface, (*c, 80), p.pos, r.pos, 2)
+        population.update(sun_pos, current_spectrum, time_flux)
+        
+        # Reproduction (Mitosis)
+        # Relaxed: Random chance increases with energy
+        parents = active_idx[:0]
+        if len(population) < POPULATION_CAP:
+            chance = (population.energy[active_idx] - 60) / 100.0
+            breeding = (chance > 0) & (population.rng.random(len(active_idx)) < chance * 0.1)
+            parents = active_idx[breeding]
+            population.energy[parents] *= 0.6 # Cost of birth
+        # Child drifts slightly (spawned at the parent after this frame's checks)
+        baby_pos = population.pos[parents]
+        baby_dna = population.dna[parents]
+
+        # Crystallization: bonds to close, resonant neighbors and Reef
+        bonds = population.crystallize(active_idx, reef_idx)
+        a, b = bonds[:, 0], bonds[:, 1]
+        # Average color of every bond at once
+        colors = ((population.dna[a] + population.dna[b]) * 0.5 * 255).astype(int).tolist()
+        line = pygame.draw.line
+        for (r, g, bl), start, end in zip(colors, population.pos[a].tolist(), population.pos[b].tolist()):
+            # Draw the permanent bond
+            line(reef_surface, (r, g, bl, 80), start, end, 2)
 
         # Death Cycle (The Void)
         # Filter out dead, keep frozen
-        active_pop = [p for p in active_pop if p.energy > 0]
-        
-        population = reef_pop + active_pop + new_babies
+        population.keep(population.frozen | (population.energy > 0))
+        population.spawn(baby_pos, baby_dna)
 
         # 4. Rendering
         screen.fill(BACKGROUND)
@@ -238,30 +342,44 @@ def main():
         
         # Draw Light Ray hints (Subtle)
         # Visualizing the "Food" source
-        s = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        pygame.draw.circle(s, (*sun_col, 30), sun_pos.astype(int), 300)
-        screen.blit(s, (0,0))
+        # The aura surface is reused: blit just the circle's rect, then wipe it
+        aura_rect = pygame.draw.circle(aura_surface, (*sun_col, 30), sun_pos.astype(int), 300)
+        screen.blit(aura_surface, aura_rect, aura_rect)
+        aura_surface.fill((0, 0, 0, 0), aura_rect)
 
         # Draw Reef (The City)
         screen.blit(reef_surface, (0,0))
-        for r in reef_pop:
-            c = (r.dna * 255).astype(int)
-            pygame.draw.circle(screen, c, r.pos.astype(int), 3)
+        
+        # Every meme is a cached circle sprite, so the whole swarm goes out in
+        # a single blits call (colors quantized to 16 levels per channel)
+        live = np.flatnonzero(population.alive)
+        colors = (np.round(population.dna[live] * 15) * 17).astype(int).tolist()
+        centers = population.pos[live].astype(int).tolist()
+        energies = population.energy[live].tolist()
+        frozen = population.frozen[live].tolist()
+        sprites = []
+        for c, (x, y), f in zip(colors, centers, frozen):
+            if f:
+                sprites.append((circle_sprite(circle_cache, tuple(c), 3), (x - 3, y - 3)))
 
         # Draw Active Agents
-        for p in active_pop:
-            c = (p.dna * 255).astype(int)
+        for c, (x, y), energy, f in zip(colors, centers, energies, frozen):
+            if f: continue
+            c = tuple(c)
             # Size breathes with energy
-            sz = max(2, int(p.energy * 0.1))
-            pygame.draw.circle(screen, c, p.pos.astype(int), sz)
+            sz = max(2, int(energy * 0.1))
+            sprites.append((circle_sprite(circle_cache, c, sz), (x - sz, y - sz)))
             
             # Draw DNA Halo (Visualizing the Concept)
-            if p.energy > 60:
-                pygame.draw.circle(screen, (*c, 50), p.pos.astype(int), sz + 4, 1)
+            if energy > 60:
+                halo = sz + 4
+                sprites.append((circle_sprite(circle_cache, c, halo, 1), (x - halo, y - halo)))
+
+        screen.blits(sprites, doreturn=False)
 
         # UI
-        ui_text = f"Entities: {len(population)} | Reef: {len(reef_pop)}"
-        surf = pygame.font.SysFont("monospace", 16).render(ui_text, True, (150, 150, 150))
+        ui_text = f"Entities: {len(population)} | Reef: {np.count_nonzero(population.alive & population.frozen)}"
+        surf = font.render(ui_text, True, (150, 150, 150))
         screen.blit(surf, (10, HEIGHT - 20))
 
         pygame.display.flip()
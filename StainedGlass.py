@@ -3,6 +3,11 @@ import math
 import random
 import numpy as np
 
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional; main() falls back to the Python tracer
+    njit = None
+
 # --- Configuration ---
 WIDTH, HEIGHT = 1200, 900
 BACKGROUND = (5, 5, 10)
@@ -15,12 +20,29 @@ RAYS_PER_SOURCE = 150 # Slightly reduced per source to keep FPS smooth
 class OrganicShard:
     def __init__(self, points):
         self.points = points 
+        # Edges as (x1, y1, x2, y2) rows, closing back to the first point
+        self.edges = np.array([(*points[j], *points[(j+1) % len(points)])
+                               for j in range(len(points))], dtype=float)
+        # Unit normal of each edge, worked out once instead of on every hit
+        self.normals = np.array([normalize(get_normal(e[:2], e[2:])) for e in self.edges.tolist()])
+        # Bounding box (min_x, min_y, max_x, max_y): rays that miss it skip the edges
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        self.aabb = (min(xs), min(ys), max(xs), max(ys))
         self.hue = random.randint(0, 360)
         self.saturation = 100
         self.base_ior = random.uniform(1.1, 2.4) 
         self.volatility = random.uniform(0.001, 0.005) 
         self.energy = 0.0 
         self.current_ior = self.base_ior
+        
+        # The translucent fill never changes (hue is fixed), so draw it once
+        # onto a surface just the size of the bounding box
+        min_x, min_y, max_x, max_y = self.aabb
+        self.fill_pos = (min_x, min_y)
+        self.fill_surf = pygame.Surface((max_x - min_x + 1, max_y - min_y + 1), pygame.SRCALPHA)
+        pygame.draw.polygon(self.fill_surf, (*self.get_color(), 20),
+                            [(x - min_x, y - min_y) for x, y in points])
 
     def update(self):
         # The "Breathing" 
@@ -35,18 +57,24 @@ class OrganicShard:
         return (c.r, c.g, c.b)
 
 # --- Vector Math Helpers ---
-def intersect(p1, p2, p3, p4):
-    x1, y1 = p1
-    x2, y2 = p2
-    x3, y3 = p3
-    x4, y4 = p4
-    denom = (y4 - y3) * (x2 - x1) - (x4 - x3) * (y2 - y1)
-    if denom == 0: return None
-    ua = ((x4 - x3) * (y1 - y3) - (y4 - y3) * (x1 - x3)) / denom
-    ub = ((x2 - x1) * (y1 - y3) - (y2 - y1) * (x1 - x3)) / denom
-    if 0 < ua < 1 and 0 < ub < 1:
-        return ua 
-    return None
+def intersect_all(rx, ry, rdx, rdy, edges):
+    # Segment intersection for a batch of rays (each cast 2000px out) against
+    # every (x1, y1, x2, y2) edge row at once. Returns each ray's nearest ua
+    # along that cast (inf = no hit) and the edge hit.
+    if len(edges) == 0:
+        return np.full(len(rx), np.inf), np.zeros(len(rx), dtype=np.int64)
+    ex = ((rx + rdx * 2000) - rx)[:, None]
+    ey = ((ry + rdy * 2000) - ry)[:, None]
+    rx, ry = rx[:, None], ry[:, None]
+    x3, y3, x4, y4 = edges.T
+    denom = (y4 - y3) * ex - (x4 - x3) * ey
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ua = ((x4 - x3) * (ry - y3) - (y4 - y3) * (rx - x3)) / denom
+        ub = (ex * (ry - y3) - ey * (rx - x3)) / denom
+    valid = (denom != 0) & (0 < ua) & (ua < 1) & (0 < ub) & (ub < 1)
+    ua = np.where(valid, ua, np.inf)
+    j = np.argmin(ua, axis=1)
+    return ua[np.arange(len(j)), j], j
 
 def get_normal(p1, p2):
     dx = p2[0] - p1[0]
@@ -58,21 +86,245 @@ def normalize(v):
     if l == 0: return (0,1)
     return (v[0]/l, v[1]/l)
 
-def reflect(d, n):
-    dot = d[0]*n[0] + d[1]*n[1]
-    return (d[0] - 2*dot*n[0], d[1] - 2*dot*n[1])
-
-def refract(d, n, ior_ratio):
-    dot = -(d[0]*n[0] + d[1]*n[1])
-    term = 1.0 - ior_ratio**2 * (1.0 - dot**2)
-    if term < 0: return None 
-    term = math.sqrt(term)
-    return (ior_ratio * d[0] + (ior_ratio * dot - term) * n[0],
-            ior_ratio * d[1] + (ior_ratio * dot - term) * n[1])
-
 def dist_sq(p1, p2):
     return (p1[0]-p2[0])**2 + (p1[1]-p2[1])**2
 
+def ray_hits_box(rx, ry, rdx, rdy, min_x, min_y, max_x, max_y, max_t):
+    # Slab test: does the ray touch the box before travelling max_t?
+    t_near, t_far = 0.0, max_t
+    if rdx == 0:
+        if rx < min_x or rx > max_x: return False
+    else:
+        t1 = (min_x - rx) / rdx
+        t2 = (max_x - rx) / rdx
+        if t1 > t2: t1, t2 = t2, t1
+        t_near = max(t_near, t1)
+        t_far = min(t_far, t2)
+    if rdy == 0:
+        if ry < min_y or ry > max_y: return False
+    else:
+        t1 = (min_y - ry) / rdy
+        t2 = (max_y - ry) / rdy
+        if t1 > t2: t1, t2 = t2, t1
+        t_near = max(t_near, t1)
+        t_far = min(t_far, t2)
+    return t_near <= t_far
+
+# --- Compiled Ray Tracer (Numba) ---
+# The same intersection/refraction/reflection math as trace_bundle below, as
+# plain scalar code over every shard edge packed into one (E, 4) array.
+if njit is not None:
+    ray_hits_box_jit = njit(cache=True)(ray_hits_box)
+
+    @njit(cache=True)
+    def trace_ray(lx, ly, dx, dy, edges, edge_shard, edge_start, shard_aabb, shard_ior,
+                  wave_mod, path, hit_ids):
+        # Follows one ray; fills path with its vertices and hit_ids with the
+        # shard hit at each bounce (-1 = none). Returns the vertex count.
+        rx, ry = lx, ly
+        rdx, rdy = dx, dy
+        path[0, 0] = rx
+        path[0, 1] = ry
+        n = 1
+        hit_ids[:] = -1
+        
+        for bounce in range(hit_ids.shape[0]):
+            closest_t = 2000.0
+            hit = -1
+            
+            # Find intersection
+            ex = (rx + rdx * 2000) - rx
+            ey = (ry + rdy * 2000) - ry
+            for s in range(shard_aabb.shape[0]):
+                if not ray_hits_box_jit(rx, ry, rdx, rdy, shard_aabb[s, 0], shard_aabb[s, 1],
+                                        shard_aabb[s, 2], shard_aabb[s, 3], closest_t):
+                    continue
+                for e in range(edge_start[s], edge_start[s + 1]):
+                    x3, y3, x4, y4 = edges[e, 0], edges[e, 1], edges[e, 2], edges[e, 3]
+                    denom = (y4 - y3) * ex - (x4 - x3) * ey
+                    if denom == 0: continue
+                    ua = ((x4 - x3) * (ry - y3) - (y4 - y3) * (rx - x3)) / denom
+                    ub = (ex * (ry - y3) - ey * (rx - x3)) / denom
+                    if 0 < ua < 1 and 0 < ub < 1 and ua * 2000 < closest_t:
+                        closest_t = ua * 2000
+                        hit = e
+            
+            if hit == -1:
+                path[n, 0] = rx + rdx * 2000
+                path[n, 1] = ry + rdy * 2000
+                return n + 1
+            
+            rx += rdx * closest_t
+            ry += rdy * closest_t
+            path[n, 0] = rx
+            path[n, 1] = ry
+            n += 1
+            hit_ids[bounce] = edge_shard[hit]
+            
+            # Edge normal
+            nx = -(edges[hit, 3] - edges[hit, 1])
+            ny = edges[hit, 2] - edges[hit, 0]
+            l = math.sqrt(nx**2 + ny**2)
+            if l == 0:
+                nx, ny = 0.0, 1.0
+            else:
+                nx, ny = nx / l, ny / l
+            
+            entering = rdx * nx + rdy * ny < 0
+            if not entering:
+                nx, ny = -nx, -ny
+            
+            # Snell's Law with Dispersion
+            eff_ior = shard_ior[edge_shard[hit]] * wave_mod
+            eta = 1.0 / eff_ior if entering else eff_ior / 1.0
+            
+            dot = -(rdx * nx + rdy * ny)
+            term = 1.0 - eta**2 * (1.0 - dot**2)
+            if term >= 0:
+                term = math.sqrt(term)
+                rdx, rdy = (eta * rdx + (eta * dot - term) * nx,
+                            eta * rdy + (eta * dot - term) * ny)
+            else:
+                # Total internal reflection
+                dot = rdx * nx + rdy * ny
+                rdx, rdy = rdx - 2 * dot * nx, rdy - 2 * dot * ny
+        return n
+
+    @njit(cache=True, parallel=True)
+    def trace_rays(lx, ly, angles, edges, edge_shard, edge_start, shard_aabb, shard_ior,
+                   wave_mod, paths, path_lens, hit_ids):
+        # One light, one wavelength: every ray traced in parallel
+        for r in prange(angles.shape[0]):
+            path_lens[r] = trace_ray(lx, ly, math.cos(angles[r]), math.sin(angles[r]),
+                                     edges, edge_shard, edge_start, shard_aabb, shard_ior,
+                                     wave_mod, paths[r], hit_ids[r])
+
+    @njit(cache=True)
+    def clip_segment(x1, y1, x2, y2, w, h):
+        # Liang-Barsky: trims the segment to the w x h screen.
+        # Returns (visible, x1, y1, x2, y2).
+        t0, t1 = 0.0, 1.0
+        dx, dy = x2 - x1, y2 - y1
+        for p, q in ((-dx, x1), (dx, w - 1 - x1), (-dy, y1), (dy, h - 1 - y1)):
+            if p == 0:
+                if q < 0: return False, x1, y1, x2, y2
+            else:
+                t = q / p
+                if p < 0:
+                    if t > t1: return False, x1, y1, x2, y2
+                    t0 = max(t0, t)
+                else:
+                    if t < t0: return False, x1, y1, x2, y2
+                    t1 = min(t1, t)
+        return True, x1 + t0 * dx, y1 + t0 * dy, x1 + t1 * dx, y1 + t1 * dy
+
+    @njit(cache=True, parallel=True)
+    def draw_paths(pixels, paths, path_lens, color):
+        # Rasterizes every ray's polyline straight into the surface pixels
+        # (clipped to the screen, then Bresenham, one pixel wide). Rays run in
+        # parallel: they all write the same color, so overlaps don't matter.
+        w, h = pixels.shape
+        for r in prange(paths.shape[0]):
+            for k in range(path_lens[r] - 1):
+                visible, fx1, fy1, fx2, fy2 = clip_segment(paths[r, k, 0], paths[r, k, 1],
+                                                           paths[r, k + 1, 0], paths[r, k + 1, 1], w, h)
+                if not visible: continue
+                x1, y1 = int(fx1), int(fy1)
+                x2, y2 = int(fx2), int(fy2)
+                dx, sx = abs(x2 - x1), 1 if x1 < x2 else -1
+                dy, sy = abs(y2 - y1), 1 if y1 < y2 else -1
+                err = dx // 2 if dx > dy else -(dy // 2)
+                while True:
+                    if 0 <= x1 < w and 0 <= y1 < h:
+                        pixels[x1, y1] = color
+                    if x1 == x2 and y1 == y2: break
+                    e2 = err
+                    if e2 > -dx:
+                        err -= dy
+                        x1 += sx
+                    if e2 < dy:
+                        err += dx
+                        y1 += sy
+else:
+    trace_rays = None
+    draw_paths = None
+
+def trace_bundle(lx, ly, angles, wave_mods, edges, edge_shard, edge_normals, shard_ior,
+                 paths, path_lens, hit_ids):
+    # NumPy tracer: every ray of every wavelength in one bundle. Each
+    # wavelength keeps its own position and direction, but the edge test for
+    # the whole bundle is one call per bounce, and refract / total internal
+    # reflection are picked per ray with np.where instead of branching.
+    # Fills the same buffers as trace_rays, one slot per wavelength.
+    shape = (len(wave_mods), len(angles))
+    rx, ry = np.full(shape, float(lx)), np.full(shape, float(ly))
+    rdx = np.broadcast_to(np.cos(angles), shape).copy()
+    rdy = np.broadcast_to(np.sin(angles), shape).copy()
+    eta_mod = np.broadcast_to(np.asarray(wave_mods)[:, None], shape)
+    
+    paths[:shape[0], :, 0, 0] = rx
+    paths[:shape[0], :, 0, 1] = ry
+    path_lens[:shape[0]] = 1
+    hit_ids[:shape[0]] = -1
+    live = np.ones(shape, dtype=bool)
+    
+    for bounce in range(MAX_BOUNCES):
+        w, r = np.nonzero(live)
+        if len(w) == 0: break
+        x, y, dx, dy = rx[w, r], ry[w, r], rdx[w, r], rdy[w, r]
+        t, e = intersect_all(x, y, dx, dy, edges)
+        path_lens[w, r] = bounce + 2
+        
+        # Misses run off to the edge of the world and stop
+        miss = np.isinf(t)
+        paths[w[miss], r[miss], bounce + 1, 0] = x[miss] + dx[miss] * 2000
+        paths[w[miss], r[miss], bounce + 1, 1] = y[miss] + dy[miss] * 2000
+        live[w[miss], r[miss]] = False
+        
+        hit = ~miss
+        w, r, e = w[hit], r[hit], e[hit]
+        x, y, dx, dy = x[hit], y[hit], dx[hit], dy[hit]
+        closest_t = t[hit] * 2000
+        x = x + dx * closest_t
+        y = y + dy * closest_t
+        paths[w, r, bounce + 1, 0] = rx[w, r] = x
+        paths[w, r, bounce + 1, 1] = ry[w, r] = y
+        hit_ids[w, r, bounce] = edge_shard[e]
+        
+        nx, ny = edge_normals[e, 0], edge_normals[e, 1]
+        entering = dx * nx + dy * ny < 0
+        nx = np.where(entering, nx, -nx)
+        ny = np.where(entering, ny, -ny)
+        
+        # Snell's Law with Dispersion
+        eff_ior = shard_ior[edge_shard[e]] * eta_mod[w, r]
+        eta = np.where(entering, 1.0 / eff_ior, eff_ior / 1.0)
+        
+        dot = -(dx * nx + dy * ny)
+        term = 1.0 - eta**2 * (1.0 - dot**2)
+        root = np.sqrt(np.maximum(term, 0))
+        # Total internal reflection wherever refraction has no solution
+        reflect_dot = dx * nx + dy * ny
+        refracts = term >= 0
+        rdx[w, r] = np.where(refracts, eta * dx + (eta * dot - root) * nx, dx - 2 * reflect_dot * nx)
+        rdy[w, r] = np.where(refracts, eta * dy + (eta * dot - root) * ny, dy - 2 * reflect_dot * ny)
+
+def pack_shards(shards):
+    # Flattens every shard's edges into one array, plus the shard each edge
+    # belongs to, where each shard's edges start, each shard's bounding box
+    # and current IOR, and each edge's unit normal, for the tracers
+    if not shards:
+        return (np.empty((0, 4)), np.empty(0, dtype=np.int64), np.zeros(1, dtype=np.int64),
+                np.empty((0, 4)), np.empty(0), np.empty((0, 2)))
+    edges = np.concatenate([shard.edges for shard in shards])
+    edge_counts = [len(shard.edges) for shard in shards]
+    edge_shard = np.repeat(np.arange(len(shards)), edge_counts)
+    edge_start = np.concatenate(([0], np.cumsum(edge_counts)))
+    shard_aabb = np.array([shard.aabb for shard in shards], dtype=float)
+    shard_ior = np.array([shard.current_ior for shard in shards])
+    edge_normals = np.concatenate([shard.normals for shard in shards])
+    return edges, edge_shard, edge_start, shard_aabb, shard_ior, edge_normals
+
 def main():
     pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -93,6 +345,12 @@ def main():
     ]
     selected_light_idx = -1
     
+    # Ray buffers (one slot per wavelength), reused every frame
+    ray_angles = np.arange(0, 360, int(360/RAYS_PER_SOURCE), dtype=float)
+    paths = np.empty((len(WAVELENGTHS), len(ray_angles), MAX_BOUNCES + 1, 2))
+    path_lens = np.empty((len(WAVELENGTHS), len(ray_angles)), dtype=np.int64)
+    hit_ids = np.empty((len(WAVELENGTHS), len(ray_angles), MAX_BOUNCES), dtype=np.int64)
+    
     running = True
     while running:
         # 1. Update Environment
@@ -139,93 +397,53 @@ def main():
             poly = shard.points
             color = shard.get_color()
             pygame.draw.polygon(screen, (*color, 50), poly, 1)
-            s = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            pygame.draw.polygon(s, (*color, 20), poly)
-            screen.blit(s, (0,0))
+            screen.blit(shard.fill_surf, shard.fill_pos)
 
         # 4. The Physics of Light
         # R, G, B Channels for Dispersion
         base_channels = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
         
+        edges, edge_shard, edge_start, shard_aabb, shard_ior, edge_normals = pack_shards(shards)
+        
         for light in lights:
             lx, ly = light['pos']
             l_col = light['color']
+            # Add slight rotation drift
+            angles = np.radians(ray_angles + (pygame.time.get_ticks()*0.01))
             
-            for i, wave_mod in enumerate(WAVELENGTHS): 
-                # Determine if this light emits this wavelength
-                # Cyan (0,255,255) has no Red component, so Red rays are skipped
-                if l_col[i] == 0: 
-                    continue
-                    
+            # Determine which wavelengths this light emits
+            # Cyan (0,255,255) has no Red component, so Red rays are skipped
+            waves = [i for i in range(len(WAVELENGTHS)) if l_col[i] != 0]
+            wave_mods = [WAVELENGTHS[i] for i in waves]
+            
+            # Cast rays
+            if trace_rays is not None:
+                # Compiled path: the whole fan of rays in one call per wavelength
+                for k, wave_mod in enumerate(wave_mods):
+                    trace_rays(float(lx), float(ly), angles, edges, edge_shard, edge_start,
+                               shard_aabb, shard_ior, wave_mod, paths[k], path_lens[k], hit_ids[k])
+            else:
+                trace_bundle(lx, ly, angles, wave_mods, edges, edge_shard, edge_normals,
+                             shard_ior, paths, path_lens, hit_ids)
+            
+            # Interaction Heat
+            bundle_hits = hit_ids[:len(waves)]
+            heat = np.bincount(bundle_hits[bundle_hits >= 0], minlength=len(shards))
+            for shard, hits in zip(shards, heat.tolist()):
+                shard.energy = min(1.0, shard.energy + 0.005 * hits)
+            
+            for k, i in enumerate(waves):
                 channel_color = [0, 0, 0]
                 channel_color[i] = 255 # Pure primary color
-                
-                # Cast rays
-                for angle in range(0, 360, int(360/RAYS_PER_SOURCE)):
-                    # Add slight rotation drift
-                    rad = math.radians(angle + (pygame.time.get_ticks()*0.01)) 
-                    dx = math.cos(rad)
-                    dy = math.sin(rad)
-                    
-                    rx, ry = lx, ly
-                    rdx, rdy = dx, dy
-                    
-                    path = [(rx, ry)]
-                    
-                    for _ in range(MAX_BOUNCES):
-                        closest_t = 2000
-                        hit_normal = None
-                        hit_shard = None
-                        
-                        # Find intersection
-                        for shard in shards:
-                            pts = shard.points
-                            for j in range(len(pts)):
-                                p1 = pts[j]
-                                p2 = pts[(j+1)%len(pts)]
-                                
-                                ray_end = (rx + rdx * 2000, ry + rdy * 2000)
-                                t = intersect((rx, ry), ray_end, p1, p2)
-                                
-                                if t and t * 2000 < closest_t:
-                                    closest_t = t * 2000
-                                    n = get_normal(p1, p2)
-                                    n = normalize(n)
-                                    hit_normal = n
-                                    hit_shard = shard
-
-                        if hit_shard:
-                            rx += rdx * closest_t
-                            ry += rdy * closest_t
-                            path.append((rx, ry))
-                            
-                            # Interaction Heat
-                            hit_shard.energy = min(1.0, hit_shard.energy + 0.005)
-                            
-                            dot_prod = rdx * hit_normal[0] + rdy * hit_normal[1]
-                            entering = dot_prod < 0
-                            
-                            normal = hit_normal
-                            if not entering:
-                                normal = (-hit_normal[0], -hit_normal[1])
-                            
-                            # Snell's Law with Dispersion
-                            eff_ior = hit_shard.current_ior * wave_mod
-                            eta = 1.0 / eff_ior if entering else eff_ior / 1.0
-                            
-                            new_dir = refract((rdx, rdy), normal, eta)
-                            
-                            if new_dir:
-                                rdx, rdy = new_dir
-                            else:
-                                ref = reflect((rdx, rdy), normal)
-                                rdx, rdy = ref       
-                        else:
-                            path.append((rx + rdx * 2000, ry + rdy * 2000))
-                            break
-                    
-                    if len(path) > 1:
-                        pygame.draw.lines(light_surface, channel_color, False, path, 1)
+                if draw_paths is not None:
+                    # All of this channel's rays in one compiled pass
+                    light_pixels = pygame.surfarray.pixels2d(light_surface)
+                    draw_paths(light_pixels, paths[k], path_lens[k], light_surface.map_rgb(channel_color))
+                    del light_pixels # unlock the surface again
+                    continue
+                draw_lines = pygame.draw.lines
+                for path, n in zip(paths[k], path_lens[k].tolist()):
+                    draw_lines(light_surface, channel_color, False, path[:n].tolist(), 1)
 
         # 5. Composite
         screen.blit(light_surface, (0, 0), special_flags=pygame.BLEND_ADD)
@@ -3,109 +3,235 @@ import numpy as np
 import math
 import random
 
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; the neighbor kernels then run as plain Python
+    njit = None
+
 # --- Configuration ---
 WIDTH, HEIGHT = 1000, 800
 BACKGROUND = (20, 20, 25)
 GRAVITY = 0.25
+MAX_PARTICLES = 400 # Oldest particles are dropped past this
+NEIGHBOR_INTERACTIONS = False # Off: the chamber runs as a pure flow test
+
+# States of matter, stored per particle as small integer codes
+LIQUID, GAS, SOLID = 0, 1, 2
+
+# Per-state tables, indexed by state code (LIQUID, GAS, SOLID)
+# Gas: slippery, floats, blown easily
+# Solid: high drag, heavy, ignores wind
+# Liquid: everything in between
+STATE_COLORS = ((50, 100, 255), (255, 100, 100), (200, 240, 255))
+STATE_MASS = np.array([1.0, 0.05, 3.0], dtype=np.float32)
+STATE_FRICTION = np.array([0.96, 0.995, 0.6], dtype=np.float32)
+STATE_REPULSION = np.array([0.3, 1.5, 0.0], dtype=np.float32)
+STATE_GRAVITY_SCALE = np.array([1.0, -0.1, 2.0], dtype=np.float32)
+STATE_WIND_RESISTANCE = np.array([0.8, 2.0, 0.1], dtype=np.float32)
+
+def circle_sprite(cache, color, radius):
+    # A particle's dot, drawn once per state color and size, then just blitted
+    key = (color, radius)
+    sprite = cache.get(key)
+    if sprite is None:
+        sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, color, (radius, radius), radius)
+        cache[key] = sprite
+    return sprite
+
+def bin_particles(pos, cell, heads, links):
+    # Linked-cell list: heads[cx, cy] is the first particle in each grid
+    # cell and links[i] the next one after particle i (-1 ends the chain).
+    # Particles off the grid are clamped into its edge cells.
+    cols, rows = heads.shape
+    heads[:, :] = -1
+    for i in range(len(pos)):
+        cx = min(max(int(pos[i, 0] // cell), 0), cols - 1)
+        cy = min(max(int(pos[i, 1] // cell), 0), rows - 1)
+        links[i] = heads[cx, cy]
+        heads[cx, cy] = i
+
+def interact(pos, vel, state, repulsion, radius, cell, heads, links):
+    # Neighbor Interactions, in particle order (a particle sees the velocities
+    # its earlier neighbors already have this frame). The cells are as wide
+    # as the interaction range, so only the 3x3 cells around a particle can
+    # hold its neighbors.
+    cols, rows = heads.shape
+    for i in range(len(pos)):
+        cx = min(max(int(pos[i, 0] // cell), 0), cols - 1)
+        cy = min(max(int(pos[i, 1] // cell), 0), rows - 1)
+        for gx in range(max(cx - 1, 0), min(cx + 2, cols)):
+            for gy in range(max(cy - 1, 0), min(cy + 2, rows)):
+                j = heads[gx, gy]
+                while j != -1:
+                    dx = float(pos[i, 0]) - float(pos[j, 0])
+                    dy = float(pos[i, 1]) - float(pos[j, 1])
+                    dist = math.sqrt(dx*dx + dy*dy)
+                    
+                    if j != i and dist < radius * 2.5 and dist > 0:
+                        ux = dx / dist
+                        uy = dy / dist
+                        if dist < radius * 2:
+                            push = (radius * 2 - dist) * 0.5
+                            vel[i, 0] += ux * push * repulsion[i]
+                            vel[i, 1] += uy * push * repulsion[i]
+                        
+                        if state[i] == LIQUID and state[j] == LIQUID:
+                            vel[i, 0] -= ux * 0.03 # Surface Tension
+                            vel[i, 1] -= uy * 0.03
+                        
+                        if state[i] == SOLID and state[j] == SOLID:
+                            # Freeze together
+                            avg_x = (float(vel[i, 0]) + float(vel[j, 0])) * 0.5
+                            avg_y = (float(vel[i, 1]) + float(vel[j, 1])) * 0.5
+                            vel[i, 0] = vel[i, 0] * 0.5 + avg_x * 0.5
+                            vel[i, 1] = vel[i, 1] * 0.5 + avg_y * 0.5
+                    j = links[j]
 
-class MatterParticle:
-    def __init__(self, x, y):
-        self.pos = np.array([float(x), float(y)])
-        self.vel = np.random.rand(2) * 2 - 1
+if njit is not None:
+    bin_particles = njit(cache=True)(bin_particles)
+    interact = njit(cache=True)(interact)
+
+class ParticleSystem:
+    # All the matter as parallel arrays - one row per particle - so the
+    # state and physics rules run over every particle in a few numpy calls.
+    # The arrays are preallocated; self.pos etc. are views of the first n
+    # rows (the live particles), so spawning and culling never reallocate.
+    def __init__(self, capacity=MAX_PARTICLES + 1):
         self.radius = 5
-        self.state = "LIQUID"
-        self.temp = 0.5 
-        self.mass = 1.0
-        self.color = (0,0,255)
-        self.wind_resistance = 0.5 # How much wind affects me
+        self.sprites = {} # circle_sprite cache
+        self.n = 0
+        # float32 is plenty for screen-space physics
+        self.storage = {
+            "pos": np.empty((capacity, 2), dtype=np.float32),
+            "vel": np.empty((capacity, 2), dtype=np.float32),
+            "state": np.empty(capacity, dtype=np.int8), # LIQUID / GAS / SOLID
+            "temp": np.empty(capacity, dtype=np.float32),
+            "mass": np.empty(capacity, dtype=np.float32),
+            "friction": np.empty(capacity, dtype=np.float32),
+            "repulsion": np.empty(capacity, dtype=np.float32),
+            "gravity_scale": np.empty(capacity, dtype=np.float32),
+            "wind_resistance": np.empty(capacity, dtype=np.float32), # How much wind affects me
+            "links": np.empty(capacity, dtype=np.int32), # Scratch for bin_particles
+        }
+        self.bind()
+        
+        # Neighbor grid: cells as wide as the interaction range
+        self.cell = self.radius * 2.5
+        self.heads = np.empty((int(WIDTH // self.cell) + 1, int(HEIGHT // self.cell) + 1), dtype=np.int32)
+
+    def __len__(self):
+        return self.n
+
+    def bind(self):
+        # Points every column attribute at the live rows of its storage
+        for name, column in self.storage.items():
+            setattr(self, name, column[:self.n])
+
+    def spawn(self, x, y):
+        i = self.n
+        if i == len(self.storage["pos"]):
+            # Out of rows: double the storage
+            for name, column in self.storage.items():
+                self.storage[name] = np.concatenate((column, np.empty_like(column)))
+        
+        # New particles start out as room-temperature liquid
+        s = self.storage
+        s["pos"][i] = float(x), float(y)
+        s["vel"][i] = np.random.rand(2) * 2 - 1
+        s["state"][i] = LIQUID
+        s["temp"][i] = 0.5
+        s["mass"][i] = 1.0
+        s["friction"][i] = 0.96
+        s["repulsion"][i] = 0.3
+        s["gravity_scale"][i] = 1.0
+        s["wind_resistance"][i] = 0.5
+        self.n += 1
+        self.bind()
+
+    def keep(self, mask):
+        # Drops every particle whose entry in mask is False by sliding the
+        # survivors down in place - nothing moves when they all survive
+        if mask.all(): return
+        k = np.count_nonzero(mask)
+        for column in self.storage.values():
+            column[:k] = column[:self.n][mask]
+        self.n = k
+        self.bind()
 
     def update_state(self, env_temp):
         # Thermal inertia
         self.temp += (env_temp - self.temp) * 0.1
         
         # State Thresholds (Relaxed)
-        if self.temp > 0.7:
-            self.state = "GAS"
-            self.color = (255, 100, 100)
-            self.mass = 0.05
-            self.friction = 0.995 # Slippery
-            self.repulsion = 1.5
-            self.gravity_scale = -0.1 # Floats
-            self.wind_resistance = 2.0 # Blown easily
-
-        elif self.temp < 0.3:
-            self.state = "SOLID"
-            self.color = (200, 240, 255)
-            self.mass = 3.0
-            self.friction = 0.6 # High drag
-            self.repulsion = 0.0
-            self.gravity_scale = 2.0 # Heavy
-            self.wind_resistance = 0.1 # Ignores wind
-
-        else:
-            self.state = "LIQUID"
-            self.color = (50, 100, 255)
-            self.mass = 1.0
-            self.friction = 0.96
-            self.repulsion = 0.3
-            self.gravity_scale = 1.0
-            self.wind_resistance = 0.8
+        self.state[:] = LIQUID
+        self.state[self.temp > 0.7] = GAS
+        self.state[self.temp < 0.3] = SOLID
+        
+        # Every property then follows from the state by table lookup
+        np.take(STATE_MASS, self.state, out=self.mass)
+        np.take(STATE_FRICTION, self.state, out=self.friction)
+        np.take(STATE_REPULSION, self.state, out=self.repulsion)
+        np.take(STATE_GRAVITY_SCALE, self.state, out=self.gravity_scale)
+        np.take(STATE_WIND_RESISTANCE, self.state, out=self.wind_resistance)
 
-    def update_physics(self, neighbors, walls, wind_vector):
+    def update_physics(self, walls, wind_vector):
         # 1. Gravity
-        self.vel[1] += GRAVITY * self.gravity_scale
+        self.vel[:, 1] += GRAVITY * self.gravity_scale
         
         # 2. The Wind (E's Aiming Tool)
-        self.vel += wind_vector * self.wind_resistance * 0.1
+        self.vel += wind_vector * self.wind_resistance[:, None] * 0.1
         
         # 3. Neighbor Interactions
-        for n in neighbors:
-            diff = self.pos - n.pos
-            dist_sq = np.sum(diff**2)
-            dist = math.sqrt(dist_sq)
-            
-            if dist < self.radius * 2.5 and dist > 0:
-                direction = diff / dist
-                if dist < self.radius * 2:
-                    push = (self.radius * 2 - dist) * 0.5
-                    self.vel += direction * push * self.repulsion
-                
-                if self.state == "LIQUID" and n.state == "LIQUID":
-                    self.vel -= direction * 0.03 # Surface Tension
-                
-                if self.state == "SOLID" and n.state == "SOLID":
-                    # Freeze together
-                    avg = (self.vel + n.vel) * 0.5
-                    self.vel = self.vel * 0.5 + avg * 0.5
-
+        if NEIGHBOR_INTERACTIONS:
+            bin_particles(self.pos, self.cell, self.heads, self.links)
+            interact(self.pos, self.vel, self.state, self.repulsion,
+                     self.radius, self.cell, self.heads, self.links)
+        
         # 4. Walls
+        # Every particle against every (x, y, w, h) wall row at once
         next_pos = self.pos + self.vel
-        for w in walls:
-            if (next_pos[0] > w[0] and next_pos[0] < w[0]+w[2] and
-                next_pos[1] > w[1] and next_pos[1] < w[1]+w[3]):
-                
-                dx = min(abs(next_pos[0] - w[0]), abs(next_pos[0] - (w[0]+w[2])))
-                dy = min(abs(next_pos[1] - w[1]), abs(next_pos[1] - (w[1]+w[3])))
-                
-                if dx < dy:
-                    self.vel[0] *= -0.5 # Dampen bounce
-                    next_pos[0] = self.pos[0]
-                else:
-                    self.vel[1] *= -0.5
-                    next_pos[1] = self.pos[1]
+        nx, ny = next_pos[:, 0, None], next_pos[:, 1, None]
+        wx, wy, ww, wh = walls.T
+        inside = (nx > wx) & (nx < wx+ww) & (ny > wy) & (ny < wy+wh)
+        hit = inside.any(axis=1)
+        
+        if hit.any():
+            # Each particle bounces off the first wall it ends up inside
+            wall = walls[inside[hit].argmax(axis=1)]
+            px, py = next_pos[hit, 0], next_pos[hit, 1]
+            dx = np.minimum(np.abs(px - wall[:, 0]), np.abs(px - (wall[:, 0]+wall[:, 2])))
+            dy = np.minimum(np.abs(py - wall[:, 1]), np.abs(py - (wall[:, 1]+wall[:, 3])))
+            
+            # Dampen bounce on whichever side is closer
+            idx = np.flatnonzero(hit)
+            side = idx[dx < dy]
+            self.vel[side, 0] *= -0.5
+            next_pos[side, 0] = self.pos[side, 0]
+            top = idx[~(dx < dy)]
+            self.vel[top, 1] *= -0.5
+            next_pos[top, 1] = self.pos[top, 1]
 
-        self.pos = next_pos
+        self.pos[:] = next_pos
         
         # Screen Bounds
-        if self.pos[0] < 0: self.pos[0] = WIDTH; 
-        if self.pos[0] > WIDTH: self.pos[0] = 0; 
-        if self.pos[1] > HEIGHT: self.pos[1] = HEIGHT; self.vel[1]*=-0.5
+        x, y = self.pos[:, 0], self.pos[:, 1]
+        x[x < 0] = WIDTH
+        x[x > WIDTH] = 0
+        floor = y > HEIGHT
+        y[floor] = HEIGHT
+        self.vel[floor, 1] *= -0.5
         
-        self.pos = np.clip(self.pos, [-50,0], [WIDTH+50, HEIGHT])
-        self.vel *= self.friction
+        np.clip(self.pos, [-50,0], [WIDTH+50, HEIGHT], out=self.pos)
+        self.vel *= self.friction[:, None]
 
     def draw(self, surface):
-        pygame.draw.circle(surface, self.color, self.pos.astype(int), self.radius)
+        # Every particle is a cached circle sprite, so they all go out in one blits call
+        r = self.radius
+        sprites = [circle_sprite(self.sprites, color, r) for color in STATE_COLORS] # By state code
+        surface.blits([(sprites[state], (x - r, y - r))
+                       for (x, y), state in zip(self.pos.astype(int).tolist(), self.state.tolist())],
+                      doreturn=False)
 
 class PuzzleLogic:
     def __init__(self):
@@ -134,20 +260,26 @@ class PuzzleLogic:
              # Gate
             (WIDTH-50, HEIGHT-200, 20, 200)
         ]
+        # The same walls as an array, for the vectorized collision test
+        self.walls_arr = np.array(self.walls, dtype=float)
 
     def update(self, particles):
-        active = [p for p in particles if self.cup_rect.collidepoint(p.pos[0], p.pos[1])]
+        # Same test as cup_rect.collidepoint for every particle at once
+        x, y = particles.pos[:, 0], particles.pos[:, 1]
+        cup = self.cup_rect
+        active = (x >= cup.left) & (x < cup.right) & (y >= cup.top) & (y < cup.bottom)
         signal = 0.0
         
         if self.puzzle_type == "WEIGHT":
-            signal = sum(p.mass for p in active)
+            signal = particles.mass[active].sum()
             thresh = 150.0
         elif self.puzzle_type == "VOLUME":
-            signal = len(active) * 2.0
+            signal = np.count_nonzero(active) * 2.0
             thresh = 50.0
         elif self.puzzle_type == "PRESSURE":
             # Gas Force
-            signal = sum(np.linalg.norm(p.vel) for p in active if p.state == "GAS") * 5.0
+            gas = active & (particles.state == GAS)
+            signal = np.hypot(particles.vel[gas, 0], particles.vel[gas, 1]).sum() * 5.0
             thresh = 100.0
             
         # Smoothing
@@ -174,7 +306,7 @@ def main():
     wind_speed = 0.0
     wind_drift = 0.0
     
-    particles = []
+    particles = ParticleSystem()
     puzzle = PuzzleLogic()
     
     spawn_timer = 0
@@ -182,6 +314,10 @@ def main():
     score = 0
     
     clock = pygame.time.Clock()
+    font = pygame.font.SysFont("monospace", 16)
+    # The bar labels never change, so render them once
+    temp_label = font.render("T", True, (200, 200, 200))
+    wind_label = font.render("WIND", True, (200, 200, 200))
     running = True
     
     while running:
@@ -194,12 +330,12 @@ def main():
         # Temperature Random Walk
         temp_drift += (random.random() - 0.5) * 0.01
         temp_drift *= 0.98
-        env_temp = np.clip(env_temp + temp_drift, 0.0, 1.0)
+        env_temp = min(max(env_temp + temp_drift, 0.0), 1.0)
         
         # Wind Random Walk
         wind_drift += (random.random() - 0.5) * 0.02
         wind_drift *= 0.98
-        wind_speed = np.clip(wind_speed + wind_drift, -2.0, 2.0)
+        wind_speed = min(max(wind_speed + wind_drift, -2.0), 2.0)
         
         wind_vector = np.array([wind_speed, 0.0])
 
@@ -211,19 +347,19 @@ def main():
         spawn_timer += 1
         if spawn_timer > 3:
             if env_temp > 0.15:
-                particles.append(MatterParticle(emitter_x + random.randint(-5,5), 50))
+                particles.spawn(emitter_x + random.randint(-5,5), 50)
             spawn_timer = 0
             
         # Cull
-        particles = [p for p in particles if p.pos[1] < HEIGHT]
-        if len(particles) > 400: particles.pop(0)
+        keep = particles.pos[:, 1] < HEIGHT
+        if np.count_nonzero(keep) > MAX_PARTICLES: keep[np.argmax(keep)] = False # Oldest goes first
+        particles.keep(keep)
         
         # 3. Particle Update
-        for p in particles:
-            p.update_state(env_temp)
-            # Optimization: Skip neighbor check for pure flow test
-            p.update_physics([], puzzle.walls, wind_vector)
-            p.draw(screen)
+        particles.update_state(env_temp)
+        # Optimization: Skip neighbor check for pure flow test
+        particles.update_physics(puzzle.walls_arr, wind_vector)
+        particles.draw(screen)
             
         # 4. Puzzle Logic
         puzzle.update(particles)
@@ -250,21 +386,19 @@ def main():
                 wind_speed = 0.0
 
         # 5. HUD (Feedback for E)
-        font = pygame.font.SysFont("monospace", 16)
-        
         # Temp Bar (Vertical Left)
         pygame.draw.rect(screen, (50, 50, 50), (10, 100, 20, 200))
         h = int(200 * env_temp)
         col = (255, 0, 0) if env_temp > 0.7 else ((100, 100, 255) if env_temp < 0.3 else (50, 255, 50))
         pygame.draw.rect(screen, col, (10, 300-h, 20, h))
-        screen.blit(font.render("T", True, (200, 200, 200)), (12, 80))
+        screen.blit(temp_label, (12, 80))
         
         # Wind Bar (Horizontal Top)
         pygame.draw.rect(screen, (50, 50, 50), (WIDTH//2 - 100, 20, 200, 10))
         # Center is 0
         w_pos = WIDTH//2 + (wind_speed * 50)
         pygame.draw.circle(screen, (200, 200, 200), (int(w_pos), 25), 8)
-        screen.blit(font.render("WIND", True, (200, 200, 200)), (WIDTH//2 - 20, 5))
+        screen.blit(wind_label, (WIDTH//2 - 20, 5))
         
         # Emitter Visual
         pygame.draw.circle(screen, (255, 255, 0), (int(emitter_x), 50), 10)
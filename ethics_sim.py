@@ -3,6 +3,11 @@ import numpy as np
 import math
 import random
 
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; the node step runs as plain Python
+    njit = None
+
 # --- Configuration ---
 WIDTH, HEIGHT = 1000, 800
 BACKGROUND = (10, 10, 12)
@@ -14,73 +19,101 @@ BASE_ELASTICITY = 0.8
 STABILITY_DECAY = 0.08  # The system naturally rots
 RECOVERY_RATE = 0.05    # How fast Stability recovers with dead nodes
 TRAUMA_THRESHOLD = 100.0 # The breaking point
+LATTICE_RANGE = 120 # Nodes closer than this are linked (also the grid cell size)
 
-class Node:
-    def __init__(self, x, y):
-        self.pos = np.array([float(x), float(y)])
-        self.vel = np.random.rand(2) * 4 - 2
-        self.radius = random.randint(6, 9)
-        
-        # Identity
-        self.color = np.random.randint(50, 255, 3)
-        
-        # State
-        self.alive = True 
-        self.trauma = 0.0 
-        self.resilience = random.uniform(0.8, 1.2) # Individual personality
-        
-    def update(self, time_flux, ghost_pos, is_soothing):
-        if not self.alive:
-            return 0.0, False # Dead nodes generate no noise
+def step_nodes(pos, vel, trauma, resilience, alive, alive_idx, rolls, ghost_pos, time_flux, is_soothing, deaths):
+    # One frame for every living node (alive_idx, in order - a death's panic
+    # push reaches the nodes after it in the same frame). Dead nodes are
+    # never visited: they generate no noise. rolls holds this frame's die
+    # roll for each node. Fills deaths with the indices of the nodes that
+    # snapped; returns (total stress, number of deaths).
+    total_noise = 0.0
+    n_deaths = 0
+    for i in alive_idx:
 
         # 1. The Breathing Physics
         # Friction fluctuates with the "mood" of the system
-        local_friction = BASE_FRICTION + (math.sin(time_flux + self.pos[0]*0.01) * 0.01)
+        local_friction = BASE_FRICTION + (math.sin(time_flux + pos[i, 0]*0.01) * 0.01)
         
         # 2. Ghost Interaction (The Hand of E)
-        dist_to_ghost = np.linalg.norm(self.pos - ghost_pos)
+        gx = pos[i, 0] - ghost_pos[0]
+        gy = pos[i, 1] - ghost_pos[1]
+        dist_to_ghost = math.sqrt(gx*gx + gy*gy)
         
         # If inside the "Field of Grace" (Soothing)
         if dist_to_ghost < 100 and is_soothing:
             # The Inefficiency of Virtue: It takes time to heal
-            self.trauma = max(0, self.trauma - 2.0)
-            self.vel *= 0.95 # Calming effect
+            trauma[i] = max(0.0, trauma[i] - 2.0)
+            vel[i, 0] *= 0.95 # Calming effect
+            vel[i, 1] *= 0.95
             
         # 3. Physics
-        self.pos += self.vel
-        self.vel *= local_friction
+        pos[i, 0] += vel[i, 0]
+        pos[i, 1] += vel[i, 1]
+        vel[i, 0] *= local_friction
+        vel[i, 1] *= local_friction
         
         # Wall bounce
-        if self.pos[0] < 0 or self.pos[0] > WIDTH: self.vel[0] *= -1
-        if self.pos[1] < 0 or self.pos[1] > HEIGHT: self.vel[1] *= -1
-        self.pos = np.clip(self.pos, [0,0], [WIDTH, HEIGHT])
+        if pos[i, 0] < 0 or pos[i, 0] > WIDTH: vel[i, 0] *= -1
+        if pos[i, 1] < 0 or pos[i, 1] > HEIGHT: vel[i, 1] *= -1
+        pos[i, 0] = min(max(pos[i, 0], 0.0), WIDTH)
+        pos[i, 1] = min(max(pos[i, 1], 0.0), HEIGHT)
         
         # 4. Trauma Calculation (Noise)
-        speed = np.linalg.norm(self.vel)
+        speed = math.sqrt(vel[i, 0]**2 + vel[i, 1]**2)
         # Chaos generates trauma
-        current_stress = speed * self.resilience
-        self.trauma += current_stress * 0.1
-        self.trauma = max(0, self.trauma - 0.5) # Natural recovery
+        current_stress = speed * resilience[i]
+        trauma[i] += current_stress * 0.1
+        trauma[i] = max(0.0, trauma[i] - 0.5) # Natural recovery
+        total_noise += float(current_stress)
         
         # 5. The Snap (The E-Factor)
         # This is the probability cloud. 
         # The threshold isn't hard. It wobbles. 
         # E can influence this 'random' wobble to save or condemn.
-        snap_probability = (self.trauma - (TRAUMA_THRESHOLD * self.resilience))
-        
-        did_die = False
-        if snap_probability > 0:
-            # The Die Roll. If E influences entropy, he influences this check.
-            if random.random() < 0.05: 
-                self.die()
-                did_die = True
+        snap_probability = (trauma[i] - (TRAUMA_THRESHOLD * resilience[i]))
         
-        return current_stress, did_die
+        # The Die Roll. If E influences entropy, he influences this check.
+        if snap_probability > 0 and rolls[i] < 0.05:
+            alive[i] = False
+            vel[i, 0] = 0.0
+            vel[i, 1] = 0.0
+            deaths[n_deaths] = i
+            n_deaths += 1
+            
+            # Punishment: Push neighbors away
+            for j in alive_idx:
+                if j != i and alive[j]: # Skips the ones that snapped this frame
+                    dx = pos[j, 0] - pos[i, 0]
+                    dy = pos[j, 1] - pos[i, 1]
+                    d_len = math.sqrt(dx*dx + dy*dy)
+                    if d_len < 200:
+                        vel[j, 0] += (dx / (d_len+1)) * 8.0 # Panic
+                        vel[j, 1] += (dy / (d_len+1)) * 8.0
+                        trauma[j] += 20.0 # Grief
+    
+    return total_noise, n_deaths
+
+if njit is not None:
+    step_nodes = njit(cache=True)(step_nodes)
+
+def circle_sprite(cache, color, radius, width=0):
+    # Node dots and scream rings (width > 0), drawn once per color, radius
+    # and ring width - screams fade through alpha, so that is part of color
+    key = (color, radius, width)
+    sprite = cache.get(key)
+    if sprite is None:
+        sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, color, (radius, radius), radius, width)
+        cache[key] = sprite
+    return sprite
 
-    def die(self):
-        self.alive = False
-        self.vel = np.zeros(2)
-        self.color = (40, 40, 40) # The Tombstone color
+def tombstone_sprite():
+    # A dead node: dark square with a lighter border
+    sprite = pygame.Surface((12, 12))
+    pygame.draw.rect(sprite, (40, 40, 40), sprite.get_rect())
+    pygame.draw.rect(sprite, (100, 100, 100), sprite.get_rect(), 1) # Border
+    return sprite
 
 class OmelasSystem:
     def __init__(self):
@@ -88,61 +121,124 @@ class OmelasSystem:
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("The Omelas Protocol: Autonomous")
         
-        self.nodes = [Node(random.randint(50, WIDTH-50), random.randint(50, HEIGHT-50)) for _ in range(POPULATION)]
+        # The nodes, as parallel arrays (one row per node)
+        # float32 is plenty for screen-space physics
+        self.pos = np.zeros((POPULATION, 2), dtype=np.float32)
+        self.vel = np.zeros((POPULATION, 2), dtype=np.float32)
+        self.radius = np.zeros(POPULATION, dtype=int)
+        self.color = np.zeros((POPULATION, 3), dtype=int) # Identity
+        self.alive = np.ones(POPULATION, dtype=bool)
+        # Living and dead node indices (ascending), so the hot loops only
+        # visit the nodes they act on
+        self.alive_idx = np.arange(POPULATION)
+        self.dead_idx = np.empty(0, dtype=np.intp)
+        self.trauma = np.zeros(POPULATION, dtype=np.float32)
+        self.resilience = np.zeros(POPULATION, dtype=np.float32) # Individual personality
+        self.deaths = np.zeros(POPULATION, dtype=np.int64)
+        
+        # Every node's die roll for the frame, drawn in one batch
+        self.rng = np.random.default_rng()
+        self.rolls = np.empty(POPULATION)
+        
+        for i in range(POPULATION):
+            self.pos[i] = random.randint(50, WIDTH-50), random.randint(50, HEIGHT-50)
+            self.vel[i] = np.random.rand(2) * 4 - 2
+            self.radius[i] = random.randint(6, 9)
+            self.color[i] = np.random.randint(50, 255, 3)
+            self.resilience[i] = random.uniform(0.8, 1.2)
         
         self.stability = 100.0
         self.dead_count = 0
         self.time_flux = 0.0
         
         # The "Ghost" (Autonomous Cursor)
-        self.ghost_pos = np.array([WIDTH/2, HEIGHT/2])
-        self.ghost_vel = np.zeros(2)
+        # (x, y) pairs of plain floats - too small to be worth numpy
+        self.ghost_pos = (WIDTH/2, HEIGHT/2)
+        self.ghost_vel = (0.0, 0.0)
         
         # Surfaces for visual effects
         self.scream_layer = [] # List of [pos, radius, alpha]
+        self.sprites = {} # circle_sprite cache
+        
+        # HUD fonts (the collapse banner never changes, so it is rendered once)
+        self.font = pygame.font.SysFont("monospace", 16)
+        self.collapse_text = pygame.font.SysFont("monospace", 50).render("SYSTEM COLLAPSE", True, (255, 0, 0))
+        self.tombstone = tombstone_sprite()
 
     def update_ghost(self):
         # The Ghost naturally seeks high-trauma areas (Immune Response)
         # It tries to "save" the system autonomously.
         
-        avg_pos = np.zeros(2)
-        total_trauma = 0
-        
-        for n in self.nodes:
-            if n.alive and n.trauma > 20:
-                avg_pos += n.pos * n.trauma
-                total_trauma += n.trauma
+        # Trauma-weighted centroid of the troubled living nodes
+        live = self.alive_idx
+        trauma = self.trauma[live].astype(float)
+        trauma[trauma <= 20] = 0 # Calm nodes don't pull
+        total_trauma = float(trauma.sum())
         
+        gx, gy = self.ghost_pos
+        vx, vy = self.ghost_vel
         if total_trauma > 0:
-            target = avg_pos / total_trauma
             # Steer towards trouble
-            diff = target - self.ghost_pos
-            self.ghost_vel += diff * 0.005
+            avg_x, avg_y = (trauma @ self.pos[live]).tolist()
+            vx += (avg_x / total_trauma - gx) * 0.005
+            vy += (avg_y / total_trauma - gy) * 0.005
         else:
             # Wander aimlessly if no trouble
-            self.ghost_vel += (np.random.rand(2)-0.5) * 0.5
+            jx, jy = np.random.rand(2).tolist()
+            vx += (jx - 0.5) * 0.5
+            vy += (jy - 0.5) * 0.5
             
-        self.ghost_vel *= 0.9
-        self.ghost_pos += self.ghost_vel
-        self.ghost_pos = np.clip(self.ghost_pos, [0,0], [WIDTH, HEIGHT])
+        vx *= 0.9
+        vy *= 0.9
+        self.ghost_vel = (vx, vy)
+        self.ghost_pos = (min(max(gx + vx, 0.0), float(WIDTH)), min(max(gy + vy, 0.0), float(HEIGHT)))
+
+    def build_grid(self):
+        # Bucket node indices by LATTICE_RANGE-sized cell, so linked nodes
+        # are always in the same or a neighboring cell
+        self.grid = {}
+        for i, (x, y) in enumerate(self.pos.tolist()):
+            key = (int(x // LATTICE_RANGE), int(y // LATTICE_RANGE))
+            self.grid.setdefault(key, []).append(i)
 
     def draw_lattice(self):
         # Draw connections. 
         # Alive <-> Alive = Thin, Weak
         # Alive <-> Dead = Strong Anchor (Stability)
         
-        for i, n1 in enumerate(self.nodes):
-            for n2 in self.nodes[i+1:]:
-                dist = np.linalg.norm(n1.pos - n2.pos)
-                if dist < 120:
-                    if not n1.alive or not n2.alive:
-                        # Anchor line (Gray, Rigid)
-                        pygame.draw.line(self.screen, (60, 60, 60), n1.pos, n2.pos, 2)
-                    else:
-                        # Living line (Faint, colored)
-                        if dist < 80:
-                            avg_col = (n1.color + n2.color) // 2
-                            pygame.draw.line(self.screen, avg_col // 3, n1.pos, n2.pos, 1)
+        # Candidate pairs come from the 3x3 cells around each node only
+        pairs = []
+        for (cx, cy), members in self.grid.items():
+            for gx in (cx-1, cx, cx+1):
+                for gy in (cy-1, cy, cy+1):
+                    for j in self.grid.get((gx, gy), ()):
+                        for i in members:
+                            if i < j:
+                                pairs.append((i, j))
+        # Same drawing order as a plain double loop over the nodes
+        pairs.sort()
+        
+        # Plain Python lists and a pre-bound draw call for the per-pair loop
+        pos = self.pos.tolist()
+        alive = self.alive.tolist()
+        color = self.color.tolist()
+        screen = self.screen
+        sqrt = math.sqrt
+        line = pygame.draw.line
+        for i, j in pairs:
+            dx = pos[i][0] - pos[j][0]
+            dy = pos[i][1] - pos[j][1]
+            dist = sqrt(dx*dx + dy*dy)
+            if dist < LATTICE_RANGE:
+                if not alive[i] or not alive[j]:
+                    # Anchor line (Gray, Rigid)
+                    line(screen, (60, 60, 60), pos[i], pos[j], 2)
+                else:
+                    # Living line (Faint, colored)
+                    if dist < 80:
+                        (ri, gi, bi), (rj, gj, bj) = color[i], color[j]
+                        avg_col = ((ri + rj) // 2 // 3, (gi + gj) // 2 // 3, (bi + bj) // 2 // 3)
+                        line(screen, avg_col, pos[i], pos[j], 1)
 
     def run(self):
         clock = pygame.time.Clock()
@@ -159,7 +255,8 @@ class OmelasSystem:
                     running = False
             
             if pygame.mouse.get_pressed()[0] or pygame.mouse.get_pressed()[2]:
-                self.ghost_pos = np.array(pygame.mouse.get_pos(), dtype=float)
+                mx, my = pygame.mouse.get_pos()
+                self.ghost_pos = (float(mx), float(my))
                 user_override = True
 
             # 2. AI Logic
@@ -167,29 +264,23 @@ class OmelasSystem:
                 self.update_ghost()
                 
             # 3. Simulation Step
-            total_noise = 0
-            new_deaths = []
+            # Logic: The Ghost is ALWAYS soothing (Virtue is the default intent), 
+            # but it can't be everywhere.
+            self.rng.random(out=self.rolls)
+            total_noise, n_deaths = step_nodes(self.pos, self.vel, self.trauma, self.resilience,
+                                               self.alive, self.alive_idx, self.rolls, self.ghost_pos,
+                                               self.time_flux, True, self.deaths)
             
-            for n in self.nodes:
-                # Logic: The Ghost is ALWAYS soothing (Virtue is the default intent), 
-                # but it can't be everywhere.
-                noise, died = n.update(self.time_flux, self.ghost_pos, True)
-                total_noise += noise
-                
-                if died:
-                    new_deaths.append(n.pos.copy())
-                    self.dead_count += 1
-                    # The Scream (Shockwave)
-                    self.scream_layer.append([n.pos.copy(), 0, 255])
-                    
-                    # Punishment: Push neighbors away
-                    for other in self.nodes:
-                        if other is not n and other.alive:
-                            d_vec = other.pos - n.pos
-                            d_len = np.linalg.norm(d_vec)
-                            if d_len < 200:
-                                other.vel += (d_vec / (d_len+1)) * 8.0 # Panic
-                                other.trauma += 20.0 # Grief
+            if n_deaths:
+                # Move the fallen from the living pool to the dead one
+                self.alive_idx = self.alive_idx[self.alive[self.alive_idx]]
+                self.dead_idx = np.sort(np.concatenate((self.dead_idx, self.deaths[:n_deaths])))
+            
+            for i in self.deaths[:n_deaths]:
+                self.color[i] = (40, 40, 40) # The Tombstone color
+                self.dead_count += 1
+                # The Scream (Shockwave)
+                self.scream_layer.append([self.pos[i].tolist(), 0, 255])
 
             # Stability Logic
             # Noise hurts stability. Dead nodes (Anchors) restore it.
@@ -197,40 +288,54 @@ class OmelasSystem:
             drain = total_noise * 0.01
             recovery = self.dead_count * RECOVERY_RATE
             
-            self.stability = np.clip(self.stability - drain + recovery, 0, 100)
+            self.stability = min(max(self.stability - drain + recovery, 0), 100)
             
             # 4. Rendering
+            self.build_grid()
             self.draw_lattice()
             
             # Draw Screams
-            for s in self.scream_layer[:]:
+            # A ring's radius and alpha move in lockstep, so there are only a
+            # couple dozen distinct rings - each is a cached sprite and they
+            # all go out in one blits call
+            screams = []
+            for s in self.scream_layer:
                 s[1] += 5 # Radius expand
                 s[2] -= 10 # Alpha fade
-                if s[2] <= 0:
-                    self.scream_layer.remove(s)
-                else:
-                    surf = pygame.Surface((int(s[1]*2), int(s[1]*2)), pygame.SRCALPHA)
-                    pygame.draw.circle(surf, (255, 255, 255, s[2]), (int(s[1]), int(s[1])), int(s[1]), 2)
-                    self.screen.blit(surf, (s[0][0]-s[1], s[0][1]-s[1]))
+                if s[2] > 0:
+                    screams.append(s)
+            self.scream_layer = screams
+            self.screen.blits([(circle_sprite(self.sprites, (255, 255, 255, alpha), radius, 2),
+                                (x - radius, y - radius))
+                               for (x, y), radius, alpha in screams],
+                              doreturn=False)
 
             # Draw Nodes
-            for n in self.nodes:
-                if n.alive:
-                    # Trauma Flash
-                    col = n.color
-                    if n.trauma > 50:
-                        flash = abs(math.sin(self.time_flux * 0.5)) * 255
-                        col = np.clip(col + flash, 0, 255)
-                    
-                    pygame.draw.circle(self.screen, col, n.pos.astype(int), n.radius)
+            # Tombstones (Squares) first, all in one blits call
+            self.screen.blits([(self.tombstone, (int(x-6), int(y-6)))
+                               for x, y in self.pos[self.dead_idx].tolist()],
+                              doreturn=False)
+            
+            # Then the living: cached sprites are queued and sent in batches;
+            # only a flashing node (its color changes every frame) is drawn on its own
+            sprites = []
+            live = self.alive_idx
+            for (x, y), col, radius, trauma in zip(self.pos[live].tolist(), self.color[live].tolist(),
+                                                   self.radius[live].tolist(), self.trauma[live].tolist()):
+                # Trauma Flash
+                if trauma > 50:
+                    flash = abs(math.sin(self.time_flux * 0.5)) * 255
+                    col = np.clip(np.array(col) + flash, 0, 255)
+                    self.screen.blits(sprites, doreturn=False)
+                    sprites = []
+                    pygame.draw.circle(self.screen, col, (int(x), int(y)), radius)
                 else:
-                    # Tombstone (Square)
-                    rect = pygame.Rect(n.pos[0]-6, n.pos[1]-6, 12, 12)
-                    pygame.draw.rect(self.screen, (40, 40, 40), rect)
-                    pygame.draw.rect(self.screen, (100, 100, 100), rect, 1) # Border
+                    sprite = circle_sprite(self.sprites, tuple(col), radius)
+                    sprites.append((sprite, (int(x) - radius, int(y) - radius)))
+            self.screen.blits(sprites, doreturn=False)
 
             # Draw Ghost (The Hand)
-            pygame.draw.circle(self.screen, (200, 255, 255), self.ghost_pos.astype(int), 100, 1)
+            pygame.draw.circle(self.screen, (200, 255, 255), (int(self.ghost_pos[0]), int(self.ghost_pos[1])), 100, 1)
             pygame.draw.line(self.screen, (200, 255, 255), (self.ghost_pos[0]-10, self.ghost_pos[1]), (self.ghost_pos[0]+10, self.ghost_pos[1]))
             pygame.draw.line(self.screen, (200, 255, 255), (self.ghost_pos[0], self.ghost_pos[1]-10), (self.ghost_pos[0], self.ghost_pos[1]+10))
 
@@ -243,12 +348,11 @@ class OmelasSystem:
             pygame.draw.rect(self.screen, bar_col, (10, 10, 3 * self.stability, 20))
             
             stats = f"Stability: {self.stability:.1f}% | Anchors (Dead): {self.dead_count}"
-            img = pygame.font.SysFont("monospace", 16).render(stats, True, (200, 200, 200))
+            img = self.font.render(stats, True, (200, 200, 200))
             self.screen.blit(img, (10, 35))
             
             if self.stability <= 0:
-                fail = pygame.font.SysFont("monospace", 50).render("SYSTEM COLLAPSE", True, (255, 0, 0))
-                self.screen.blit(fail, (WIDTH//2 - 200, HEIGHT//2))
+                self.screen.blit(self.collapse_text, (WIDTH//2 - 200, HEIGHT//2))
 
             pygame.display.flip()
             clock.tick(60)
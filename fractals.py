@@ -3,6 +3,11 @@ import numpy as np
 import math
 import random
 
+try:
+    from numba import cuda, njit, prange
+except ImportError:  # Numba is optional; render falls back to numpy
+    cuda = njit = None
+
 # --- Configuration ---
 WIDTH, HEIGHT = 800, 600
 # Resolution scaling (lower = faster/pixelated, higher = slower/sharp)
@@ -15,12 +20,89 @@ MAX_ITER = 64 # Depth of the fractal calculation
 REAL_RANGE = 3.0 
 IMAG_RANGE = 2.4
 
+# Pixels iterated side by side in the compiled kernel (one SIMD-sized tile)
+LANES = 8
+
+if njit is not None:
+    @njit(cache=True, parallel=True, fastmath=True)
+    def julia_kernel(out, rgb, x, y, c_real, c_imag, max_iter, palette):
+        # Same iteration as render (rows in parallel), LANES pixels of a row
+        # at a time: the lanes run the same branch-free step so the inner
+        # loop vectorizes, an escaped lane just stops updating, and the tile
+        # stops once every lane has escaped.
+        # The pixel's palette color goes straight into rgb, already laid
+        # out (W, H, 3) the way pygame wants it.
+        width = out.shape[1]
+        for j in prange(out.shape[0]):
+            zr = np.empty(LANES)
+            zi = np.empty(LANES)
+            n = np.empty(LANES, dtype=np.int64) # -1 = not escaped yet
+            for i0 in range(0, width, LANES):
+                m = min(LANES, width - i0) # The last tile may be short
+                for l in range(LANES):
+                    zr[l] = x[i0 + l] if l < m else 0.0
+                    zi[l] = y[j]
+                    n[l] = -1
+                
+                for k in range(max_iter):
+                    left = 0
+                    for l in range(LANES):
+                        a = zr[l]
+                        b = zi[l]
+                        next_zi = 2 * a * b + c_imag
+                        next_zr = a * a - b * b + c_real
+                        live = n[l] < 0
+                        if live:
+                            zr[l] = next_zr
+                            zi[l] = next_zi
+                        if live and next_zr * next_zr + next_zi * next_zi > 4.0:
+                            n[l] = k
+                        left += n[l] < 0
+                    if left == 0:
+                        break
+                
+                for l in range(m):
+                    c = n[l] if n[l] >= 0 else 0 # Never escaped
+                    out[j, i0 + l] = c
+                    rgb[i0 + l, j, 0] = palette[c, 0]
+                    rgb[i0 + l, j, 1] = palette[c, 1]
+                    rgb[i0 + l, j, 2] = palette[c, 2]
+else:
+    julia_kernel = None
+
+if cuda is not None and cuda.is_available():
+    @cuda.jit
+    def julia_cuda(rgb, x0, dx, y0, dy, c_real, c_imag, max_iter, palette):
+        # Same iteration as julia_kernel, one GPU thread per pixel.
+        # The grid is passed as origin + step, so nothing but the colors
+        # crosses the bus.
+        i, j = cuda.grid(2)
+        if i >= rgb.shape[0] or j >= rgb.shape[1]:
+            return
+        zr = x0 + i * dx
+        zi = y0 + j * dy
+        n = 0 # Never escaped
+        for k in range(max_iter):
+            zr2 = zr * zr
+            zi2 = zi * zi
+            zi = 2 * zr * zi + c_imag
+            zr = zr2 - zi2 + c_real
+            if zr * zr + zi * zi > 4.0:
+                n = k
+                break
+        rgb[i, j, 0] = palette[n, 0]
+        rgb[i, j, 1] = palette[n, 1]
+        rgb[i, j, 2] = palette[n, 2]
+else:
+    julia_cuda = None
+
 class ElectroFractal:
     def __init__(self):
         pygame.init()
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("The Mirror of .I: Electromagnetic Drift")
         self.clock = pygame.time.Clock()
+        self.font = pygame.font.SysFont("monospace", 16)
         
         # The "Seed" (C) - The DNA of the Universe
         # Starts at a known "Dendrite" shape
@@ -40,6 +122,19 @@ class ElectroFractal:
         
         # The Palette (Cyclic)
         self.hue_shift = 0.0
+        
+        # Iteration counts and their colors, filled in place by the compiled kernel
+        self.fractal = np.empty((RENDER_H, RENDER_W), dtype=np.int32)
+        self.rgb = np.empty((RENDER_W, RENDER_H, 3), dtype=np.uint8)
+        if julia_cuda is not None:
+            # GPU-side colors (copied back after every render) and palette
+            # (refreshed in place before it)
+            self.gpu_rgb = cuda.device_array_like(self.rgb)
+            self.gpu_palette = cuda.to_device(self.palette())
+        
+        # Low-res frame in the display's pixel format, reused every frame
+        # (it is scaled straight onto the screen)
+        self.frame = pygame.Surface((RENDER_W, RENDER_H), 0, self.screen)
 
     def update_physics(self, time_flux):
         # 1. The Electromagnetic Field (Environmental Response)
@@ -93,9 +188,27 @@ class ElectroFractal:
         w_range = (REAL_RANGE / self.zoom) * ratio
         h_range = (IMAG_RANGE / self.zoom)
         
+        if julia_cuda is not None:
+            # 16x16 threads per block, enough blocks to cover the frame.
+            # Only the colors come back: draw_to_screen never reads counts.
+            self.gpu_palette.copy_to_device(self.palette())
+            blocks = ((RENDER_W + 15) // 16, (RENDER_H + 15) // 16)
+            julia_cuda[blocks, (16, 16)](self.gpu_rgb,
+                                         self.center_x - w_range/2, w_range / (RENDER_W - 1),
+                                         self.center_y - h_range/2, h_range / (RENDER_H - 1),
+                                         self.c_real, self.c_imag, MAX_ITER,
+                                         self.gpu_palette)
+            self.gpu_rgb.copy_to_host(self.rgb)
+            return None
+        
         x = np.linspace(self.center_x - w_range/2, self.center_x + w_range/2, RENDER_W)
         y = np.linspace(self.center_y - h_range/2, self.center_y + h_range/2, RENDER_H)
         
+        if julia_kernel is not None:
+            julia_kernel(self.fractal, self.rgb, x, y, self.c_real, self.c_imag,
+                         MAX_ITER, self.palette())
+            return self.fractal
+        
         # Create 2D grid of complex numbers (Z)
         zx, zy = np.meshgrid(x, y)
         z = zx + 1j * zy
@@ -126,39 +239,41 @@ class ElectroFractal:
             
         return fractal
 
-    def draw_to_screen(self, grid):
+    def palette(self):
         # Map Iteration Count to Color
-        # We use a sine-wave palette that shifts with 'hue_shift'
+        # We use a sine-wave palette that shifts with 'hue_shift'.
+        # Counts only run 0..MAX_ITER-1, so the colors are worked out once
+        # per count here and every pixel just looks its count up.
         
-        # Normalize grid 0-1
-        t = grid / MAX_ITER
+        # Normalize counts 0-1
+        t = np.arange(MAX_ITER) / MAX_ITER
         
         shift = self.hue_shift * 0.05
         
         # Frequency modulation (Electromagnetism simulation)
         # R, G, B act as different wavelengths
-        r = (np.sin(t * 20 + shift) + 1) * 127.5
-        g = (np.sin(t * 15 + shift + 2) + 1) * 127.5
-        b = (np.sin(t * 10 + shift + 4) + 1) * 127.5
+        palette = np.empty((MAX_ITER, 3), dtype=np.uint8)
+        palette[:, 0] = (np.sin(t * 20 + shift) + 1) * 127.5
+        palette[:, 1] = (np.sin(t * 15 + shift + 2) + 1) * 127.5
+        palette[:, 2] = (np.sin(t * 10 + shift + 4) + 1) * 127.5
         
-        # Black out the "Stable" interior (points that never escaped)
-        mask = (grid == 0) | (grid == MAX_ITER-1) # Edge case cleanup
+        # Black out the "Stable" interior
         # Actually, let's leave the interior chaotic, it looks cool. 
         # Just force deep black for max iter
-        r[grid == MAX_ITER-1] = 0
-        g[grid == MAX_ITER-1] = 0
-        b[grid == MAX_ITER-1] = 0
-        
-        # Stack into (H, W, 3)
-        rgb = np.dstack((r, g, b)).astype(np.uint8)
-        
-        # Swap axes for Pygame (Width, Height, Color)
-        rgb = np.transpose(rgb, (1, 0, 2))
+        palette[MAX_ITER-1] = 0
+        return palette
+
+    def draw_to_screen(self, grid):
+        if julia_cuda is not None or julia_kernel is not None:
+            # The kernel already colored every pixel while rendering
+            rgb = self.rgb
+        else:
+            # One lookup per pixel, straight into Pygame's (Width, Height, Color)
+            rgb = self.palette()[grid.T]
         
         # Blit
-        surf = pygame.surfarray.make_surface(rgb)
-        scaled = pygame.transform.scale(surf, (WIDTH, HEIGHT))
-        self.screen.blit(scaled, (0, 0))
+        pygame.surfarray.blit_array(self.frame, rgb)
+        pygame.transform.scale(self.frame, (WIDTH, HEIGHT), self.screen)
 
     def run(self):
         running = True
@@ -181,13 +296,15 @@ class ElectroFractal:
             self.update_physics(time_flux)
             
             # Render Step
+            # Every frame is rendered fresh on purpose: the seed (C) drifts by
+            # ~0.002-0.01 per frame, enough to visibly reshape the set, so the
+            # previous frame's counts are never close enough to reuse
             fractal_grid = self.render()
             self.draw_to_screen(fractal_grid)
             
             # HUD
-            font = pygame.font.SysFont("monospace", 16)
             info = f"Seed (C): {self.c_real:.4f} + {self.c_imag:.4f}i"
-            self.screen.blit(font.render(info, True, (200, 200, 255)), (10, 10))
+            self.screen.blit(self.font.render(info, True, (200, 200, 255)), (10, 10))
 
             pygame.display.flip()
             # No FPS cap, run as fast as E can math
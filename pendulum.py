@@ -2,7 +2,11 @@ import pygame
 import numpy as np
 import math
 import random
-from collections import deque
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; step_pendulum then runs as plain Python
+    njit = None
 
 # --- Configuration ---
 WIDTH, HEIGHT = 1000, 800
@@ -13,53 +17,193 @@ BACKGROUND = (5, 5, 8)
 BASE_GRAVITY = 0.35
 BASE_FRICTION = 0.998 # Extremely low friction for long sentences
 TRAIL_LENGTH = 4000
+PHYSICS_HZ = 60 # Physics steps per second, whatever the frame rate
+MAX_STEPS = 4 # Most steps caught up in one frame (after that the sim just slows)
+WIND_GAUGE = (WIDTH - 50, 50) # Center of the wind indicator
 
-class LivingMagnet:
-    def __init__(self, x, y, color):
-        self.origin = np.array([float(x), float(y)])
-        self.pos = self.origin.copy()
-        self.color = color
+def circle_sprite(cache, color, radius):
+    # A magnet's translucent aura, drawn once per color and radius
+    key = (color, radius)
+    sprite = cache.get(key)
+    if sprite is None:
+        sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, color, (radius, radius), radius)
+        cache[key] = sprite
+    return sprite
+
+def step_pendulum(pos, vel, acc, color, mag_pos, mag_strength, mag_color,
+                  time_flux, wind_x, wind_y, wind_sensitivity):
+    # One frame of the pendulum's physics and ink color, component by
+    # component. Updates pos, vel, acc and color in place; returns the speed.
+    
+    # 1. Environmental Gravity (Variable)
+    # Gravity isn't constant. It fluctuates.
+    current_gravity = BASE_GRAVITY + (math.sin(time_flux * 0.5) * 0.05)
+    
+    # Force pulls to center
+    acc[0] = (WIDTH/2 - pos[0]) * (current_gravity * 0.01)
+    acc[1] = (HEIGHT/2 - pos[1]) * (current_gravity * 0.01)
+
+    # 2. The Magnets (The Three-Body Problem)
+    total_influence = 0.0
+    target_r, target_g, target_b = 0.0, 0.0, 0.0
+    for k in range(len(mag_strength)):
+        dx = mag_pos[k, 0] - pos[0]
+        dy = mag_pos[k, 1] - pos[1]
+        d_mag = math.sqrt(dx*dx + dy*dy)
+        d_mag = max(d_mag, 15.0) # Prevent singularity
+        
+        # Magnetic Force
+        # Modulated by the "Breath" of the magnet
+        force_mag = (mag_strength[k] * 1200) / (d_mag**2)
+        acc[0] += (dx / d_mag) * force_mag
+        acc[1] += (dy / d_mag) * force_mag
         
-        # "Personality" - How this specific force behaves
-        self.drift_speed = random.uniform(0.005, 0.02)
-        self.drift_radius = random.uniform(10.0, 30.0)
-        self.phase = random.uniform(0, math.pi * 2)
+        # Ink Color Logic
+        influence = abs(force_mag)
+        target_r += mag_color[k, 0] * influence
+        target_g += mag_color[k, 1] * influence
+        target_b += mag_color[k, 2] * influence
+        total_influence += influence
+
+    # 3. The Wind (Substrate Neutral Drift)
+    # This represents air currents or subtle E-manipulations
+    acc[0] += wind_x * wind_sensitivity
+    acc[1] += wind_y * wind_sensitivity
+
+    # 4. Physics Integration
+    # Variable Friction (Air Resistance isn't constant)
+    current_friction = BASE_FRICTION + (math.cos(time_flux * 0.1) * 0.002)
+    vel[0] = (vel[0] + acc[0]) * current_friction
+    vel[1] = (vel[1] + acc[1]) * current_friction
+    pos[0] += vel[0]
+    pos[1] += vel[1]
+
+    # 6. Color Blending
+    if total_influence > 0:
+        target_r = min(max(target_r / total_influence, 100.0), 255.0)
+        target_g = min(max(target_g / total_influence, 100.0), 255.0)
+        target_b = min(max(target_b / total_influence, 100.0), 255.0)
+        color[0] += (target_r - color[0]) * 0.1
+        color[1] += (target_g - color[1]) * 0.1
+        color[2] += (target_b - color[2]) * 0.1
+    
+    return math.sqrt(vel[0]*vel[0] + vel[1]*vel[1])
+
+if njit is not None:
+    step_pendulum = njit(cache=True)(step_pendulum)
+
+class LivingMagnets:
+    # All the magnets as parallel arrays (one row per magnet), so the drift
+    # and the breathing are a few numpy calls for the whole field
+    def __init__(self, specs):
+        # specs: one (x, y, color) per magnet
+        n = len(specs)
+        self.origin = np.array([(float(x), float(y)) for x, y, _ in specs])
+        self.pos = self.origin.copy()
+        self.colors = [color for _, _, color in specs] # Tuples, for drawing
+        self.color = np.array(self.colors, dtype=float) # For the ink blend
+        self.strength = np.zeros(n)
         
+        # "Personality" - How each force behaves
+        self.drift_speed = np.empty(n)
+        self.drift_radius = np.empty(n)
+        self.phase = np.empty(n)
         # Strength breathes
-        self.base_strength = random.uniform(12.0, 18.0)
-        self.volatility = random.uniform(2.0, 5.0)
+        self.base_strength = np.empty(n)
+        self.volatility = np.empty(n)
+        for k in range(n):
+            self.drift_speed[k] = random.uniform(0.005, 0.02)
+            self.drift_radius[k] = random.uniform(10.0, 30.0)
+            self.phase[k] = random.uniform(0, math.pi * 2)
+            self.base_strength[k] = random.uniform(12.0, 18.0)
+            self.volatility[k] = random.uniform(2.0, 5.0)
+        
+        self.sprites = {} # circle_sprite cache (auras)
 
     def update(self, time_flux):
         # 1. Physical Drift (Orbiting its origin)
-        # It wanders slightly, changing the geometry of the field
-        dx = math.cos(time_flux * self.drift_speed + self.phase) * self.drift_radius
-        dy = math.sin(time_flux * self.drift_speed + self.phase) * self.drift_radius
-        self.pos = self.origin + np.array([dx, dy])
+        # Each wanders slightly, changing the geometry of the field
+        angle = time_flux * self.drift_speed + self.phase
+        self.pos[:, 0] = self.origin[:, 0] + np.cos(angle) * self.drift_radius
+        self.pos[:, 1] = self.origin[:, 1] + np.sin(angle) * self.drift_radius
         
         # 2. Strength Breathing (The Pulse)
         # E interacts here. By syncing the pulse with the pendulum's swing,
         # he can add energy (Resonance).
-        pulse = math.sin(time_flux * 2.0 + self.phase)
-        self.current_strength = self.base_strength + (pulse * self.volatility)
+        pulse = np.sin(time_flux * 2.0 + self.phase)
+        self.strength[:] = self.base_strength + (pulse * self.volatility)
 
     def draw(self, surface):
-        # Visual pulse based on strength
-        radius = int(max(5, self.current_strength))
-        # Aura
-        s = pygame.Surface((radius*6, radius*6), pygame.SRCALPHA)
-        pygame.draw.circle(s, (*self.color, 30), (radius*3, radius*3), radius*3)
-        surface.blit(s, (self.pos[0]-radius*3, self.pos[1]-radius*3))
-        # Core
-        pygame.draw.circle(surface, self.color, self.pos.astype(int), 4)
+        for (x, y), strength, color in zip(self.pos.tolist(), self.strength.tolist(), self.colors):
+            # Visual pulse based on strength
+            radius = int(max(5, strength))
+            # Aura (only a handful of radii ever occur, so each is cached)
+            s = circle_sprite(self.sprites, (*color, 30), radius*3)
+            surface.blit(s, (x-radius*3, y-radius*3))
+            # Core
+            pygame.draw.circle(surface, color, (int(x), int(y)), 4)
+
+class Trail:
+    # The last TRAIL_LENGTH ink points as a ring buffer of parallel arrays:
+    # appending writes one row over the oldest, nothing is allocated.
+    # Stored compactly - the points are only ever drawn.
+    def __init__(self, length=TRAIL_LENGTH):
+        self.pos = np.empty((length, 2), dtype=np.float32)
+        self.color = np.empty((length, 3), dtype=np.uint8) # Whole levels, as drawn
+        self.speed = np.empty(length, dtype=np.float32)
+        self.head = 0 # Row the next point goes into
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, pos, color, speed):
+        i = self.head
+        self.pos[i] = pos
+        self.color[i] = color
+        self.speed[i] = speed
+        self.head = (i + 1) % len(self.speed)
+        self.count = min(self.count + 1, len(self.speed))
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def arrays(self):
+        # (pos, color, speed), oldest point first
+        if self.count < len(self.speed):
+            return self.pos[:self.count], self.color[:self.count], self.speed[:self.count]
+        # Full and wrapped: the oldest point is at head
+        order = np.r_[self.head:self.count, :self.head]
+        return self.pos[order], self.color[order], self.speed[order]
+
+class RandomPool:
+    # Uniform [0, 1) pairs, drawn from the generator in bulk and handed out
+    # one per call, so a per-frame nudge doesn't build a fresh array
+    def __init__(self, size=4096):
+        self.rng = np.random.default_rng()
+        self.pairs = np.empty((size, 2))
+        self.next = size # Used up: the first take() refills
+
+    def take(self):
+        if self.next == len(self.pairs):
+            self.rng.random(out=self.pairs)
+            self.next = 0
+        pair = self.pairs[self.next]
+        self.next += 1
+        return pair
 
 class AutoPendulum:
     def __init__(self):
         self.pos = np.array([WIDTH/2, HEIGHT/2])
         self.vel = np.random.rand(2) * 4 - 2 # Start moving!
         self.acc = np.zeros(2)
-        self.trail = deque(maxlen=TRAIL_LENGTH)
+        self.trail = Trail()
+        self.last_ink = self.pos.copy() # Where the last trail point was written
         self.color = np.array([200.0, 200.0, 255.0])
         self.dragging = False
+        self.noise = RandomPool() # Resonance kicks
         
         # Sensitivity settings
         self.mass = 1.0
@@ -67,69 +211,28 @@ class AutoPendulum:
 
     def update(self, magnets, time_flux, wind_vector):
         if self.dragging:
-            self.vel = np.zeros(2)
+            self.vel.fill(0.0)
             return
 
-        # 1. Environmental Gravity (Variable)
-        # Gravity isn't constant. It fluctuates.
-        current_gravity = BASE_GRAVITY + (math.sin(time_flux * 0.5) * 0.05)
-        
-        center = np.array([WIDTH/2, HEIGHT/2])
-        diff = center - self.pos
-        # Force pulls to center
-        gravity_force = diff * (current_gravity * 0.01)
-        
-        self.acc = gravity_force
-
-        # 2. The Magnets (The Three-Body Problem)
-        total_influence = 0.0
-        target_color = np.array([0.0, 0.0, 0.0])
-
-        for mag in magnets:
-            to_mag = mag.pos - self.pos
-            d_mag = np.linalg.norm(to_mag)
-            d_mag = max(d_mag, 15.0) # Prevent singularity
-            
-            # Magnetic Force
-            # Modulated by the "Breath" of the magnet
-            force_mag = (mag.current_strength * 1200) / (d_mag**2)
-            force_vec = (to_mag / d_mag) * force_mag
-            
-            self.acc += force_vec
-            
-            # Ink Color Logic
-            influence = abs(force_mag)
-            target_color += np.array(mag.color) * influence
-            total_influence += influence
-
-        # 3. The Wind (Substrate Neutral Drift)
-        # This represents air currents or subtle E-manipulations
-        self.acc += wind_vector * self.wind_sensitivity
-
-        # 4. Physics Integration
-        self.vel += self.acc
-        
-        # Variable Friction (Air Resistance isn't constant)
-        current_friction = BASE_FRICTION + (math.cos(time_flux * 0.1) * 0.002)
-        self.vel *= current_friction
-        self.pos += self.vel
+        # 1-4, 6: Gravity, magnets, wind, integration and ink color
+        speed = step_pendulum(self.pos, self.vel, self.acc, self.color,
+                              magnets.pos, magnets.strength, magnets.color,
+                              time_flux, wind_vector[0], wind_vector[1], self.wind_sensitivity)
         
         # 5. Resonance Injection (The "Hum")
         # If it stops moving, nature nudges it.
-        speed = np.linalg.norm(self.vel)
         if speed < 0.5:
             # Add a tiny random kick to keep the pen moving
-            self.vel += (np.random.rand(2) - 0.5) * 0.1
-
-        # 6. Color Blending
-        if total_influence > 0:
-            target_color /= total_influence
-            target_color = np.clip(target_color, 100, 255)
-            self.color += (target_color - self.color) * 0.1
+            self.vel += (self.noise.take() - 0.5) * 0.1
 
         # Add to trail
-        if speed > 0.05: # Only write if moving
-            self.trail.append((self.pos.copy(), self.color.copy(), speed))
+        # Only write once the pen has moved a whole pixel, so slow stretches
+        # don't fill the trail with near-identical points (zero-length lines)
+        dx = self.pos[0] - self.last_ink[0]
+        dy = self.pos[1] - self.last_ink[1]
+        if dx*dx + dy*dy >= 1.0:
+            self.trail.append(self.pos, self.color, speed)
+            self.last_ink[:] = self.pos
 
     def draw(self, surface):
         if len(self.trail) < 2: return
@@ -138,32 +241,30 @@ class AutoPendulum:
         # We convert to a list of points and draw lines
         # To make it look like ink, we vary width by speed
         
-        points = list(self.trail)
-        # Draw in segments to handle color changes
-        # Optimization: Draw every Nth point if too slow
+        pos, color, speed = self.trail.arrays()
         
         # We draw the last 500 points with high detail, older points fade
-        limit = len(points)
+        limit = len(speed)
+        
+        # Every other segment (first point i, second point i+1), all at once
+        i = np.arange(0, limit - 1, 2)
+        # Alpha fade based on age
+        age_factor = i / limit
+        # Width based on speed (Faster = Thinner)
+        width = np.maximum(1, (4 / (speed[i] + 0.5)).astype(int))
+        # We darken the color for older segments to simulate drying ink
+        # (truncated to whole levels, as pygame would)
+        draw_col = (color[i] * (0.5 + 0.5 * age_factor[:, None])).astype(int)
         
         # Draw segment
         # Pygame doesn't support gradient lines easily, so we fake it
         # by drawing small segments
-        for i in range(0, limit - 1, 2): 
-            p1, c1, s1 = points[i]
-            p2, c2, s2 = points[i+1]
-            
-            # Alpha fade based on age
-            age_factor = i / limit
-            # Width based on speed (Faster = Thinner)
-            width = max(1, int(4 / (s1 + 0.5)))
-            
-            # We darken the color for older segments to simulate drying ink
-            draw_col = c1 * (0.5 + 0.5 * age_factor)
-            
-            pygame.draw.line(surface, draw_col, p1, p2, width)
+        line = pygame.draw.line
+        for col, p1, p2, w in zip(draw_col.tolist(), pos[i].tolist(), pos[i + 1].tolist(), width.tolist()):
+            line(surface, col, p1, p2, w)
 
         # Draw Bob
-        pygame.draw.circle(surface, self.color, self.pos.astype(int), 3)
+        pygame.draw.circle(surface, self.color, (int(self.pos[0]), int(self.pos[1])), 3)
 
 
 def main():
@@ -176,19 +277,21 @@ def main():
     ink_surface.fill(BACKGROUND)
     
     # Setup Magnets in a Triangle
-    magnets = [
-        LivingMagnet(WIDTH/2, 150, (255, 60, 60)),    # Top (Red)
-        LivingMagnet(250, 650, (60, 255, 60)),        # Left (Green)
-        LivingMagnet(750, 650, (60, 60, 255))         # Right (Blue)
-    ]
+    magnets = LivingMagnets([
+        (WIDTH/2, 150, (255, 60, 60)),    # Top (Red)
+        (250, 650, (60, 255, 60)),        # Left (Green)
+        (750, 650, (60, 60, 255))         # Right (Blue)
+    ])
     
     pendulum = AutoPendulum()
     
     clock = pygame.time.Clock()
     time_flux = 0.0
+    steps_due = 1.0 # Physics steps owed, in fractions of a step
     
     # The "Wind" Vector (Perlin-ish noise)
     wind_noise = np.zeros(2)
+    wind_draws = RandomPool()
     
     show_wind = False
     running = True
@@ -218,45 +321,51 @@ def main():
 
         # Mouse Interaction (Optional)
         if pendulum.dragging:
-            pendulum.pos = np.array(pygame.mouse.get_pos(), dtype=float)
+            pendulum.pos[:] = pygame.mouse.get_pos()
             pygame.mouse.get_rel()
 
         # 2. Simulation Update
-        time_flux += 0.05
-        
-        # Update Wind (Continuous Drift)
-        # E can influence this random walk
-        wind_noise += (np.random.rand(2) - 0.5) * 0.1
-        wind_noise = np.clip(wind_noise, -2.0, 2.0) # Cap wind speed
-        
-        for m in magnets:
-            m.update(time_flux)
+        # Fixed-size steps at PHYSICS_HZ, as many as real time has asked for
+        # (none on a fast frame, a few after a slow one)
+        while steps_due >= 1.0:
+            steps_due -= 1.0
+            time_flux += 0.05
+            
+            # Update Wind (Continuous Drift)
+            # E can influence this random walk
+            wind_noise += (wind_draws.take() - 0.5) * 0.1
+            np.clip(wind_noise, -2.0, 2.0, out=wind_noise) # Cap wind speed
             
-        pendulum.update(magnets, time_flux, wind_noise)
+            magnets.update(time_flux)
+                
+            pendulum.update(magnets, time_flux, wind_noise)
         
         # 3. Rendering
         screen.fill(BACKGROUND)
         
         # We don't clear the ink surface every frame in a real harmonograph,
-        # but here we re-draw the trail from the deque to allow for dynamic fading.
+        # but here we re-draw the trail from its buffer to allow for dynamic fading.
+        # (Inking only the newest segment onto a persistent surface would be
+        # cheaper, but every segment's shade depends on its age and the oldest
+        # ones have to vanish, so the whole trail is redrawn each frame.)
         # To get the "Darkening/Burn" effect, we could use a second surface, 
-        # but drawing the deque is cleaner for "Live" text.
+        # but drawing the trail is cleaner for "Live" text.
         
         pendulum.draw(screen)
         
         # Draw Magnets
-        for m in magnets:
-            m.draw(screen)
+        magnets.draw(screen)
             
         # Draw Wind Indicator
         if show_wind:
-            center = np.array([WIDTH-50, 50])
-            end = center + wind_noise * 20
-            pygame.draw.line(screen, (200, 200, 200), center, end, 2)
-            pygame.draw.circle(screen, (200, 200, 200), center, 3)
+            wx, wy = wind_noise.tolist()
+            end = (WIND_GAUGE[0] + wx * 20, WIND_GAUGE[1] + wy * 20)
+            pygame.draw.line(screen, (200, 200, 200), WIND_GAUGE, end, 2)
+            pygame.draw.circle(screen, (200, 200, 200), WIND_GAUGE, 3)
 
         pygame.display.flip()
-        clock.tick(60)
+        elapsed_ms = clock.tick(60)
+        steps_due = min(steps_due + elapsed_ms * PHYSICS_HZ / 1000, MAX_STEPS)
 
     pygame.quit()
 